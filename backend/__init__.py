@@ -0,0 +1 @@
+"""Deep Research Agent backend: LangGraph workflow, FastAPI server and CLI."""
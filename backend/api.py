@@ -1,17 +1,22 @@
 import os
 import sys
-import json
 import asyncio
+import atexit
+import logging
+import logging.handlers
+import queue
 import time
 import pathlib
+from contextlib import asynccontextmanager
 from datetime import datetime
+import orjson
 import uvicorn
-from fastapi import FastAPI, HTTPException, WebSocket, WebSocketDisconnect
+from fastapi import FastAPI, Header, HTTPException, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import StreamingResponse
-from pydantic import BaseModel
-from typing import Dict, Any, Optional, AsyncIterator
-from uuid import uuid4
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+from pydantic import BaseModel, Field
+from typing import Dict, Any, List, Optional, AsyncIterator, Tuple
+from secrets import token_hex
 
 # Add parent directory to path to ensure imports work correctly
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
@@ -22,10 +27,40 @@ _dotenv_path = pathlib.Path(__file__).parent / ".env"
 _load_dotenv(dotenv_path=_dotenv_path if _dotenv_path.exists() else None, override=False)
 
 from backend.workflow import ImprovedResearchWorkflow
-from backend.config import config
-from backend.nodes import get_llm, _content_to_str
-
-app = FastAPI(title="Deep Research Agent API", version="2.0.0")
+from backend.config import Phase, config, reload_config
+from backend.nodes import get_llm, close_llm_clients, reset_llm_clients, save_semantic_caches, _content_to_str
+
+# Records go through a queue to a background listener thread, so handler I/O
+# never blocks the event loop. LOG_LEVEL=DEBUG restores the verbose tracing.
+logger = logging.getLogger("research")
+logger.setLevel(os.getenv("LOG_LEVEL", "INFO").upper())
+if not logger.handlers:
+    _log_queue: queue.SimpleQueue = queue.SimpleQueue()
+    logger.addHandler(logging.handlers.QueueHandler(_log_queue))
+    logger.propagate = False
+    _log_listener = logging.handlers.QueueListener(_log_queue, logging.StreamHandler())
+    _log_listener.start()
+    atexit.register(_log_listener.stop)
+
+class _ORJSONResponse(JSONResponse):
+    """JSONResponse rendered with orjson (fastapi.responses.ORJSONResponse is deprecated upstream)"""
+
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
+
+@asynccontextmanager
+async def _lifespan(app: FastAPI):
+    yield
+    # Release the pooled Gemini connections shared across requests
+    await close_llm_clients()
+    save_semantic_caches()
+
+app = FastAPI(
+    title="Deep Research Agent API",
+    version="2.0.0",
+    default_response_class=_ORJSONResponse,
+    lifespan=_lifespan,
+)
 
 # CORS middleware — origins driven by config (CORS_ORIGINS env var)
 app.add_middleware(
@@ -33,16 +68,154 @@ app.add_middleware(
     allow_origins=config.cors_origins,
     allow_credentials=True,
     allow_methods=["*"],
-    allow_headers=["*"],
+    # Explicit headers + a day-long max_age let browsers cache preflights
+    allow_headers=["Content-Type", "Authorization", "Last-Event-ID", "Accept"],
+    max_age=86400,
 )
 
 # Initialize the research workflow
 research_workflow = ImprovedResearchWorkflow()
 
+def _dumps(obj: Any) -> bytes:
+    """Serialize to UTF-8 JSON bytes with orjson, stringifying anything non-native"""
+    return orjson.dumps(obj, default=str, option=orjson.OPT_NON_STR_KEYS)
+
+try:
+    import ormsgpack
+except ImportError:  # msgpack framing is optional; clients fall back to JSON
+    ormsgpack = None
+
+def _packb(obj: Any) -> bytes:
+    """Serialize to MessagePack bytes with ormsgpack, stringifying anything non-native"""
+    return ormsgpack.packb(obj, default=str, option=ormsgpack.OPT_NON_STR_KEYS)
+
+# WebSocket frame encoders, selected by the client's "encoding" field
+_WS_ENCODERS = {"json": _dumps}
+if ormsgpack is not None:
+    _WS_ENCODERS["msgpack"] = _packb
+
+# Timeline phase for each top-level workflow node we report on
+_NODE_PHASES = {
+    "generate_queries": Phase.GENERATING_QUERIES,
+    "web_search": Phase.SEARCH_WEB,
+    "reflection": Phase.REFLECTION,
+    "answer_generation": Phase.GENERATING_ANSWER,
+}
+_REPORTED_NODES = frozenset(_NODE_PHASES)
+
+# Pre-encoded "event:" lines for the SSE event types we emit
+_SSE_EVENT_LINES = {
+    event_type: b"\nevent: " + event_type.encode() + b"\ndata: "
+    for event_type in ("node_start", "node_complete", "complete", "content", "done", "error")
+}
+
+def _sse_frame(event_id: int, event_type: str, payload: Any) -> bytes:
+    """Assemble an SSE frame (id, event, data) from byte pieces"""
+    event_line = _SSE_EVENT_LINES.get(event_type)
+    if event_line is None:
+        event_line = b"\nevent: " + event_type.encode() + b"\ndata: "
+    return b"id: " + str(event_id).encode() + event_line + _dumps(payload) + b"\n\n"
+
+# Payloads estimated above this size are serialized on a worker thread
+_OFFLOAD_THRESHOLD_BYTES = 32 * 1024
+
+def _answer_size_hint(final_answer: str, citations: list) -> int:
+    """Rough byte estimate of a payload carrying the final answer and its citations"""
+    return len(final_answer) + 128 * len(citations)
+
+# answer_generation output keys the timeline needs; the answer body itself
+# only travels in the terminal "complete" frame
+_ANSWER_SUMMARY_KEYS = ("citations", "research_summary", "current_phase")
+_ANSWER_PREVIEW_CHARS = 200
+
+def _node_complete_output(node_name: str, node_out: Dict[str, Any]) -> Dict[str, Any]:
+    """Trim a node's output down to what the timeline renders for node_complete"""
+    if node_name != "answer_generation":
+        return node_out
+    final_answer = node_out.get("final_answer", "")
+    summary = {key: node_out[key] for key in _ANSWER_SUMMARY_KEYS if key in node_out}
+    summary["answer_length"] = len(final_answer)
+    summary["answer_preview"] = final_answer[:_ANSWER_PREVIEW_CHARS]
+    return summary
+
+async def _sse_frame_offloaded(event_id: int, event_type: str, payload: Any, size_hint: int) -> bytes:
+    """Same as _sse_frame, but large payloads are encoded off the event loop"""
+    if size_hint < _OFFLOAD_THRESHOLD_BYTES:
+        return _sse_frame(event_id, event_type, payload)
+    return await asyncio.get_running_loop().run_in_executor(
+        None, _sse_frame, event_id, event_type, payload
+    )
+
+_STREAM_END = object()
+
+async def _coalesce(
+    src: AsyncIterator[bytes], max_bytes: int = 16384, max_delay: float = 0.005,
+    max_pending: int = 64
+) -> AsyncIterator[bytes]:
+    """
+    Batch SSE frames from src into larger chunks so bursts of events cost one
+    ASGI send instead of one per frame. A batch is flushed once it reaches
+    max_bytes or max_delay seconds after its first frame arrived; frames are
+    never split, so SSE framing is unchanged. At most max_pending frames are
+    buffered, so a slow client backpressures the producer instead of growing
+    memory.
+    """
+    queue: asyncio.Queue = asyncio.Queue(maxsize=max_pending)
+
+    async def pump():
+        try:
+            async for chunk in src:
+                await queue.put(chunk)
+        except Exception as e:
+            await queue.put(e)
+            return
+        await queue.put(_STREAM_END)
+
+    loop = asyncio.get_running_loop()
+    pump_task = asyncio.create_task(pump())
+    try:
+        item = await queue.get()
+        while item is not _STREAM_END:
+            if isinstance(item, Exception):
+                raise item
+            buffer = bytearray(item)
+            deadline = loop.time() + max_delay
+            item = None
+            while len(buffer) < max_bytes:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    next_item = await asyncio.wait_for(queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+                if not isinstance(next_item, bytes):
+                    # End marker or error: flush what we have first
+                    item = next_item
+                    break
+                buffer += next_item
+            yield bytes(buffer)
+            if item is None:
+                item = await queue.get()
+    finally:
+        pump_task.cancel()
+        try:
+            await pump_task
+        except asyncio.CancelledError:
+            pass
+        aclose = getattr(src, "aclose", None)
+        if aclose is not None:
+            await aclose()
+
 # API Models
 class ResearchRequest(BaseModel):
     question: str
     stream_mode: str = "values"  # "values" or "events"
+    details: bool = True  # emit timeline_update progress frames in "values" mode
+
+class BatchResearchRequest(BaseModel):
+    questions: List[str] = Field(..., min_length=1, max_length=20)
+    concurrency: int = Field(4, ge=1, le=8)  # research runs in flight at once
 
 class EditRequest(BaseModel):
     selected_text: str
@@ -56,29 +229,20 @@ class ResearchResult(BaseModel):
     research_summary: dict
     error: Optional[str] = None
 
-@app.get("/")
-@app.head("/")
-async def root():
-    return {"message": "Deep Research Agent API v2.0", "status": "healthy"}
+# Static responses are encoded once; the config payload is re-rendered by /admin/reload
+_ROOT_BYTES = orjson.dumps({"message": "Deep Research Agent API v2.0", "status": "healthy"})
 
-@app.get("/health")
-@app.head("/health")
-async def health_check():
-    return {
-        "status": "healthy",
-        "timestamp": datetime.now().isoformat(),
-        "version": "2.0.0",
-        "streaming": "native_langgraph",
-        "websocket_enabled": True
-    }
+_HEALTH_TEMPLATE = {
+    "status": "healthy",
+    "version": "2.0.0",
+    "streaming": "native_langgraph",
+    "websocket_enabled": True
+}
 
-@app.get("/config")
-@app.head("/config")
-async def get_config():
-    """Get current configuration status"""
-    return {
+def _render_config_bytes() -> bytes:
+    return orjson.dumps({
         "demo_mode": config.demo_mode,
-        "google_ai_api_key_configured": bool(config.google_ai_api_key.strip()),
+        "google_ai_api_key_configured": config.google_ai_api_key_configured,
         "config_valid": config.validate(),
         "models": {
             "query_generator": config.query_generator_model,
@@ -92,180 +256,234 @@ async def get_config():
             "max_sources_per_query": config.max_sources_per_query,
             "search_timeout_seconds": config.search_timeout_seconds
         }
-    }
+    })
 
-@app.post("/research/stream")
-async def research_stream_endpoint(request: ResearchRequest):
+_CONFIG_BYTES = _render_config_bytes()
+
+@app.get("/")
+@app.head("/")
+async def root():
+    return Response(content=_ROOT_BYTES, media_type="application/json")
+
+@app.get("/health")
+@app.head("/health")
+async def health_check():
+    return Response(
+        content=orjson.dumps({**_HEALTH_TEMPLATE, "timestamp": datetime.now().isoformat()}),
+        media_type="application/json"
+    )
+
+@app.get("/config")
+@app.head("/config")
+async def get_config():
+    """Get current configuration status"""
+    return Response(content=_CONFIG_BYTES, media_type="application/json")
+
+@app.post("/admin/reload")
+async def admin_reload(authorization: Optional[str] = Header(None)):
     """
-    Stream research using LangGraph's native streaming capabilities via Server-Sent Events
+    Re-read backend/.env, rebuild the config and the cached Gemini clients, e.g. after
+    rotating GOOGLE_AI_API_KEY. Disabled unless ADMIN_TOKEN is set; send it as a Bearer token.
+
+    The reload is per-process: with several workers only the one serving this request
+    is refreshed, so restart the server (or call once per worker) when running more.
     """
-    try:
-        if not request.question.strip():
-            raise HTTPException(status_code=400, detail="Question cannot be empty")
-        
-        async def generate_stream():
-            # SSE event counter for Last-Event-ID support
-            event_counter = 0
-            try:
-                print(f"[DEBUG] Starting research stream for: {request.question}")
+    global _CONFIG_BYTES
+    admin_token = os.getenv("ADMIN_TOKEN")
+    if not admin_token or authorization != f"Bearer {admin_token}":
+        raise HTTPException(status_code=403, detail="Forbidden")
+    if _dotenv_path.exists():
+        _load_dotenv(dotenv_path=_dotenv_path, override=True)
+    reload_config()
+    reset_llm_clients()
+    _CONFIG_BYTES = _render_config_bytes()
+    return {"status": "reloaded", "pid": os.getpid()}
+
+def _state_timeline_update(
+    state_data: Dict[str, Any], last_key: Optional[tuple]
+) -> Tuple[Optional[Dict[str, Any]], Optional[tuple]]:
+    """
+    Build the timeline_update for a state snapshot, or None when its phase and
+    counts are the same as the previously reported snapshot (last_key).
+    """
+    current_phase = state_data.get("current_phase", "unknown")
+    queries_count = len(state_data.get("query_list", ()))
+    search_results_count = len(state_data.get("search_results", ()))
+    research_loop = state_data.get("research_loop_count", 0)
+    key = (current_phase, queries_count, search_results_count, research_loop)
+    if key == last_key:
+        return None, last_key
+    return {
+        "type": "timeline_update",
+        "data": {
+            "phase": current_phase,
+            "status": "in_progress",
+            "progress_message": f"Processing {current_phase}...",
+            "details": {
+                "queries_count": queries_count,
+                "search_results_count": search_results_count,
+                "research_loop": research_loop
+            },
+            "timestamp": datetime.now().isoformat()
+        }
+    }, key
+
+def _build_research_stream(
+    question: str, stream_mode: str = "values", details: bool = True
+) -> StreamingResponse:
+    """
+    Build the SSE response for a research run. Callers validate the question;
+    constructing the response is synchronous, so handlers return it directly.
+    """
+    async def generate_stream():
+        # SSE event counter for Last-Event-ID support
+        event_counter = 0
+        try:
+            logger.debug("Starting research stream for: %s", question)
+            
+            if stream_mode == "events":
+                # Only emit node_start and node_complete events to avoid serialization issues
+                node_start_times: Dict[str, float] = {}
+                final_answer = ""
+                citations = []
+                
+                async for event in research_workflow.stream_research_events(question):
+                    node_name = event.get("node", "")
+                    # Only emit for top-level nodes we care about
+                    if node_name not in _REPORTED_NODES:
+                        continue
+                    event_type = event.get("type")  # "node_start" or "node_complete"
+                    ts = event.get("timestamp")
+                    if ts is None:
+                        ts = time.time()
+                    if event_type == "node_start":
+                        node_start_times[node_name] = ts
+                        payload = {
+                            "type": "node_start",
+                            "nodeId": node_name,
+                            "nodeType": node_name,
+                            "input": event.get("data", {}),
+                            "timestamp": ts
+                        }
+                    elif event_type == "node_complete":
+                        start_ts = node_start_times.get(node_name, ts)
+                        duration_ms = int((ts - start_ts) * 1000)
+                        # Only the node's own output is sent; the "input" half of the
+                        # event is a copy of the whole graph state
+                        node_out = event.get("data", {}).get("output") or {}
+
+                        # Capture final answer from answer_generation node
+                        if node_name == "answer_generation":
+                            final_answer = node_out.get("final_answer", "")
+                            citations = node_out.get("citations", [])
+
+                        payload = {
+                            "type": "node_complete",
+                            "nodeId": node_name,
+                            "output": _node_complete_output(node_name, node_out),
+                            "status": "success",
+                            "duration": duration_ms,
+                            "timestamp": ts
+                        }
+                    elif event_type == "llm_token" and node_name == "answer_generation":
+                        # Forward answer tokens as they are generated
+                        chunk = event.get("data", {}).get("chunk")
+                        content = _content_to_str(chunk.content) if chunk is not None else ""
+                        if not content:
+                            continue
+                        payload = {"type": "content", "nodeId": node_name, "content": content}
+                    else:
+                        continue
+                    # Build SSE frame with id, event, data
+                    frame = _sse_frame(event_counter, payload["type"], payload)
+                    event_counter += 1
+                    yield frame
                 
-                # Track node states for timeline
-                node_states = {
-                    "generate_queries": {"status": "pending", "phase": "generating_queries"},
-                    "web_search": {"status": "pending", "phase": "search_web"},
-                    "aggregate_results": {"status": "pending", "phase": "search_web"},
-                    "reflection": {"status": "pending", "phase": "reflection"},
-                    "answer_generation": {"status": "pending", "phase": "generating_answer"}
+                # After all events are streamed, emit a complete event
+                # The final_answer and citations were captured from answer_generation node
+                
+                # Emit complete event
+                now = time.time()
+                complete_payload = {
+                    "type": "complete",
+                    "final_result": {
+                        "final_answer": final_answer,
+                        "citations": citations,
+                        "research_summary": {
+                            "completion_time": datetime.fromtimestamp(now).isoformat()
+                        }
+                    },
+                    "timestamp": now
                 }
                 
-                if request.stream_mode == "events":
-                    # Only emit node_start and node_complete events to avoid serialization issues
-                    node_start_times: Dict[str, float] = {}
-                    final_answer = ""
-                    citations = []
-                    
-                    async for event in research_workflow.stream_research_events(request.question):
-                        event_type = event.get("type")  # "node_start" or "node_complete"
-                        node_name = event.get("node", "")
-                        # Only emit for top-level nodes we care about
-                        if node_name not in node_states:
-                            continue
-                        ts = event.get("timestamp", time.time())
-                        if event_type == "node_start":
-                            node_start_times[node_name] = ts
-                            payload = {
-                                "type": "node_start",
-                                "nodeId": node_name,
-                                "nodeType": node_name,
-                                "input": event.get("data", {}),
-                                "timestamp": ts
-                            }
-                        elif event_type == "node_complete":
-                            start_ts = node_start_times.get(node_name, ts)
-                            duration_ms = int((ts - start_ts) * 1000)
-                            raw_out = event.get("data", {})
-                            output_str = json.dumps(raw_out, default=str)
-                            
-                            # Capture final answer from answer_generation node
-                            if node_name == "answer_generation":
-                                output_data = json.loads(output_str)
-                                if "output" in output_data:
-                                    final_answer = output_data["output"].get("final_answer", "")
-                                    citations = output_data["output"].get("citations", [])
-                            
-                            payload = {
-                                "type": "node_complete",
-                                "nodeId": node_name,
-                                "output": json.loads(output_str),
-                                "status": "success",
-                                "duration": duration_ms,
-                                "timestamp": ts
-                            }
-                        else:
-                            continue
-                        # Build SSE frame with id, event, data
-                        frame = (
-                            f"id: {event_counter}\n"
-                            f"event: {payload['type']}\n"
-                            f"data: {json.dumps(payload)}\n\n"
-                        )
-                        event_counter += 1
-                        yield frame.encode("utf-8")
-                    
-                    # After all events are streamed, emit a complete event
-                    # The final_answer and citations were captured from answer_generation node
+                complete_frame = await _sse_frame_offloaded(
+                    event_counter, "complete", complete_payload,
+                    _answer_size_hint(final_answer, citations)
+                )
+                event_counter += 1
+                yield complete_frame
+                
+            else:
+                # State-based streaming for state updates
+                last_key = None
+                async for update in research_workflow.stream_research(question):
+                    # Report progress only when the phase or counts move
+                    if update.get("type") == "state_update":
+                        if details:
+                            timeline_update, last_key = _state_timeline_update(
+                                update.get("data", {}), last_key
+                            )
+                            if timeline_update is not None:
+                                yield b"data: %s\n\n" % _dumps(timeline_update)
                     
-                    # Emit complete event
-                    complete_payload = {
-                        "type": "complete",
-                        "final_result": {
-                            "final_answer": final_answer,
-                            "citations": citations,
-                            "research_summary": {
-                                "completion_time": datetime.now().isoformat()
+                    elif update.get("type") == "complete":
+                        # Send final result
+                        final_data = update.get("data", {})
+                        final_result = {
+                            "type": "research_complete",
+                            "data": {
+                                "success": True,
+                                "final_answer": final_data.get("final_answer", ""),
+                                "citations": final_data.get("citations", []),
+                                "research_summary": final_data.get("research_summary", {}),
+                                "errors": final_data.get("errors", [])
                             }
-                        },
-                        "timestamp": time.time()
-                    }
-                    
-                    complete_frame = (
-                        f"id: {event_counter}\n"
-                        f"event: complete\n"
-                        f"data: {json.dumps(complete_payload)}\n\n"
-                    )
-                    event_counter += 1
-                    yield complete_frame.encode("utf-8")
+                        }
+                        # Final completion SSE event with id
+                        complete_frame = _sse_frame(event_counter, "complete", final_result)
+                        yield complete_frame
                     
-                else:
-                    # State-based streaming for state updates
-                    async for update in research_workflow.stream_research(request.question):
-                        # Extract current phase from state
-                        if update.get("type") == "state_update":
-                            state_data = update.get("data", {})
-                            current_phase = state_data.get("current_phase", "unknown")
-                            
-                            # Convert to timeline format
-                            timeline_update = {
-                                "type": "timeline_update",
-                                "data": {
-                                    "phase": current_phase,
-                                    "status": "in_progress",
-                                    "progress_message": f"Processing {current_phase}...",
-                                    "details": {
-                                        "queries_count": len(state_data.get("query_list", [])),
-                                        "search_results_count": len(state_data.get("search_results", [])),
-                                        "research_loop": state_data.get("research_loop_count", 0)
-                                    },
-                                    "timestamp": datetime.now().isoformat()
-                                }
-                            }
-                            yield (f"data: {json.dumps(timeline_update)}\n\n").encode("utf-8")
-                        
-                        elif update.get("type") == "complete":
-                            # Send final result
-                            final_data = update.get("data", {})
-                            final_result = {
-                                "type": "research_complete",
-                                "data": {
-                                    "success": True,
-                                    "final_answer": final_data.get("final_answer", ""),
-                                    "citations": final_data.get("citations", []),
-                                    "research_summary": final_data.get("research_summary", {}),
-                                    "errors": final_data.get("errors", [])
-                                }
-                            }
-                            # Final completion SSE event with id
-                            complete_frame = (
-                                f"id: {event_counter}\n"
-                                f"event: complete\n"
-                                f"data: {json.dumps(final_result)}\n\n"
-                            )
-                            yield complete_frame.encode("utf-8")
-                        
-                        # Forward the update
-                        yield (f"data: {json.dumps(update)}\n\n").encode("utf-8")
-                
-            except Exception as e:
-                print(f"[DEBUG] Stream error: {e}")
-                error_event = {
-                    "type": "error",
-                    "error": str(e),
-                    "timestamp": datetime.now().isoformat()
-                }
-                yield (f"data: {json.dumps(error_event)}\n\n").encode("utf-8")
-        
-        return StreamingResponse(
-            generate_stream(),
-            media_type="text/event-stream",
-            headers={
-                "Cache-Control": "no-cache",
-                "Connection": "keep-alive",
-                "Content-Type": "text/event-stream",
-                "Access-Control-Allow-Origin": "*",
-                "Access-Control-Allow-Headers": "*",
+                    # Forward the update
+                    yield b"data: %s\n\n" % _dumps(update)
+            
+        except Exception as e:
+            logger.error("Stream error: %s", e)
+            error_event = {
+                "type": "error",
+                "error": str(e),
+                "timestamp": datetime.now().isoformat()
             }
-        )
-        
+            yield b"data: %s\n\n" % _dumps(error_event)
+    
+    return StreamingResponse(
+        _coalesce(generate_stream()),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "Connection": "keep-alive",
+            "Content-Type": "text/event-stream",
+        }
+    )
+
+@app.post("/research/stream")
+async def research_stream_endpoint(request: ResearchRequest):
+    """
+    Stream research using LangGraph's native streaming capabilities via Server-Sent Events
+    """
+    try:
+        if not request.question.strip():
+            raise HTTPException(status_code=400, detail="Question cannot be empty")
+        return _build_research_stream(request.question, request.stream_mode, request.details)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -282,7 +500,7 @@ async def edit_endpoint(request: EditRequest):
         if not request.full_document.strip():
             raise HTTPException(status_code=400, detail="Document cannot be empty")
 
-        print(f"[DEBUG] Starting edit stream. Instruction: {request.instruction[:50]}...")
+        logger.debug("Starting edit stream. Instruction: %.50s...", request.instruction)
 
         # Construct the prompt
         prompt = f"""You are an expert editor. The user has selected a passage from a research document and given an instruction.
@@ -300,11 +518,8 @@ INSTRUCTION: {request.instruction}"""
 
         async def generate_edit_stream():
             try:
-                # Use Gemini 2.0 Flash for speed
-                # backend/config.py usually sets gemini-3-flash-preview as the default, 
-                # but we can explicitly request a fast model if needed. 
-                # get_llm() defaults to config.query_generator_model
-                llm = get_llm() 
+                # Rewriting prose for the user is answer-quality work
+                llm = get_llm(config.answer_model)
                 
                 event_counter = 0
                 accumulated_response = ""
@@ -316,11 +531,7 @@ INSTRUCTION: {request.instruction}"""
                         accumulated_response += content
                         # Send text chunk
                         payload = {"type": "content", "content": content}
-                        yield (
-                            f"id: {event_counter}\n"
-                            f"event: content\n"
-                            f"data: {json.dumps(payload)}\n\n"
-                        ).encode("utf-8")
+                        yield _sse_frame(event_counter, "content", payload)
                         event_counter += 1
 
                 # Send done event with full result
@@ -328,20 +539,12 @@ INSTRUCTION: {request.instruction}"""
                     "type": "done",
                     "full_document": accumulated_response
                 }
-                yield (
-                    f"id: {event_counter}\n"
-                    f"event: done\n"
-                    f"data: {json.dumps(final_payload)}\n\n"
-                ).encode("utf-8")
+                yield _sse_frame(event_counter, "done", final_payload)
 
             except Exception as e:
-                print(f"[DEBUG] Edit stream error: {e}")
+                logger.error("Edit stream error: %s", e)
                 error_payload = {"type": "error", "error": str(e)}
-                yield (
-                    f"id: {event_counter}\n"
-                    f"event: error\n"
-                    f"data: {json.dumps(error_payload)}\n\n"
-                ).encode("utf-8")
+                yield _sse_frame(event_counter, "error", error_payload)
 
         return StreamingResponse(
             generate_edit_stream(),
@@ -362,101 +565,84 @@ async def research_websocket(websocket: WebSocket):
     WebSocket endpoint for real-time research streaming using LangGraph native streaming
     """
     await websocket.accept()
-    print(f"[DEBUG] WebSocket connection accepted")
+    logger.debug("WebSocket connection accepted")
+    encode = _dumps
     
     try:
         while True:
             # Receive question from client
-            data = await websocket.receive_text()
-            request_data = json.loads(data)
+            # Accept the request as either a text or a binary frame
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                raise WebSocketDisconnect(message.get("code", 1000))
+            request_data = orjson.loads(message.get("bytes") or message.get("text") or "{}")
             question = request_data.get("question", "")
             stream_mode = request_data.get("stream_mode", "values")
+            details = request_data.get("details", True)
+            # Binary MessagePack frames when the client asks for them, JSON otherwise
+            encode = _WS_ENCODERS.get(request_data.get("encoding", "json"), _dumps)
             
             if not question.strip():
-                await websocket.send_text(json.dumps({
+                await websocket.send_bytes(encode({
                     "type": "error",
                     "error": "Question cannot be empty"
                 }))
                 continue
             
-            print(f"[DEBUG] Received question via WebSocket: {question}")
+            logger.debug("Received question via WebSocket: %s", question)
             
             # Send research started signal
-            await websocket.send_text(json.dumps({
+            await websocket.send_bytes(encode({
                 "type": "research_started",
                 "question": question,
                 "timestamp": datetime.now().isoformat()
             }))
             
             try:
-                # Track node states for real-time updates
-                node_states = {
-                    "generate_queries": {"status": "pending", "phase": "generating_queries"},
-                    "web_search": {"status": "pending", "phase": "search_web"}, 
-                    "aggregate_results": {"status": "pending", "phase": "search_web"},
-                    "reflection": {"status": "pending", "phase": "reflection"},
-                    "answer_generation": {"status": "pending", "phase": "generating_answer"}
-                }
-                
                 if stream_mode == "events":
                     # Event-based streaming
                     async for event in research_workflow.stream_research_events(question):
-                        # Update node states and send timeline updates
-                        if event.get("type") == "node_start":
-                            node_name = event.get("node", "")
-                            if node_name in node_states:
-                                node_states[node_name]["status"] = "in_progress"
+                        # Send timeline updates for reported nodes
+                        event_type = event.get("type")
+                        node_name = event.get("node", "")
+                        if node_name in _REPORTED_NODES and event_type in ("node_start", "node_complete"):
+                            now_iso = datetime.now().isoformat()
+                            if event_type == "node_start":
                                 timeline_update = {
-                                    "type": event.get("type", "timeline_update"),
+                                    "type": event_type,
                                     "data": {
-                                        "phase": node_states[node_name]["phase"],
+                                        "phase": _NODE_PHASES[node_name],
                                         "status": "in_progress",
                                         "progress_message": f"Running {node_name}...",
-                                        "timestamp": datetime.now().isoformat()
+                                        "timestamp": now_iso
                                     }
                                 }
-                                await websocket.send_text(json.dumps(timeline_update))
-                        
-                        elif event.get("type") == "node_complete":
-                            node_name = event.get("node", "")
-                            if node_name in node_states:
-                                node_states[node_name]["status"] = "completed"
+                            else:
                                 timeline_update = {
-                                    "type": event.get("type", "timeline_update"),
+                                    "type": event_type,
                                     "data": {
-                                        "phase": node_states[node_name]["phase"],
+                                        "phase": _NODE_PHASES[node_name],
                                         "status": "completed",
                                         "completion_message": f"Completed {node_name}",
-                                        "timestamp": datetime.now().isoformat()
+                                        "timestamp": now_iso
                                     }
                                 }
-                                await websocket.send_text(json.dumps(timeline_update))
+                            await websocket.send_bytes(encode(timeline_update))
                         
                         # Send the event
-                        await websocket.send_text(json.dumps(event))
+                        await websocket.send_bytes(encode(event))
                 else:
                     # State-based streaming
+                    last_key = None
                     async for update in research_workflow.stream_research(question):
                         if update.get("type") == "state_update":
-                            state_data = update.get("data", {})
-                            current_phase = state_data.get("current_phase", "unknown")
-                            
-                            # Send timeline update
-                            timeline_update = {
-                                "type": "timeline_update",
-                                "data": {
-                                    "phase": current_phase,
-                                    "status": "in_progress",
-                                    "progress_message": f"Processing {current_phase}...",
-                                    "details": {
-                                        "queries_count": len(state_data.get("query_list", [])),
-                                        "search_results_count": len(state_data.get("search_results", [])),
-                                        "research_loop": state_data.get("research_loop_count", 0)
-                                    },
-                                    "timestamp": datetime.now().isoformat()
-                                }
-                            }
-                            await websocket.send_text(json.dumps(timeline_update))
+                            # Send a timeline update only when the phase or counts move
+                            if details:
+                                timeline_update, last_key = _state_timeline_update(
+                                    update.get("data", {}), last_key
+                                )
+                                if timeline_update is not None:
+                                    await websocket.send_bytes(encode(timeline_update))
                         
                         elif update.get("type") == "complete":
                             # Send final result
@@ -471,32 +657,52 @@ async def research_websocket(websocket: WebSocket):
                                     "errors": final_data.get("errors", [])
                                 }
                             }
-                            await websocket.send_text(json.dumps(final_result))
+                            await websocket.send_bytes(encode(final_result))
                             break
                         
                         # Send the update
-                        await websocket.send_text(json.dumps(update))
+                        await websocket.send_bytes(encode(update))
                 
             except Exception as e:
-                print(f"[DEBUG] Research error: {e}")
-                await websocket.send_text(json.dumps({
+                logger.error("Research error: %s", e)
+                await websocket.send_bytes(encode({
                     "type": "error",
                     "error": str(e),
                     "timestamp": datetime.now().isoformat()
                 }))
                 
     except WebSocketDisconnect:
-        print(f"[DEBUG] WebSocket disconnected")
+        logger.debug("WebSocket disconnected")
     except Exception as e:
-        print(f"[DEBUG] WebSocket error: {e}")
+        logger.error("WebSocket error: %s", e)
         try:
-            await websocket.send_text(json.dumps({
+            await websocket.send_bytes(encode({
                 "type": "error", 
                 "error": str(e)
             }))
         except:
             pass
 
+def _research_response(final_result: Dict[str, Any]) -> Dict[str, Any]:
+    """Shape a finished run's final state as a /research response"""
+    return {
+        "success": True,
+        "final_answer": final_result.get("final_answer", ""),
+        "citations": final_result.get("citations", []),
+        "research_summary": final_result.get("research_summary", {}),
+        "errors": final_result.get("errors", [])
+    }
+
+def _research_error_response(e: BaseException) -> Dict[str, Any]:
+    """Shape a failed run as a /research response"""
+    return {
+        "success": False,
+        "final_answer": "Error occurred during research process.",
+        "citations": [],
+        "research_summary": {"error": str(e)},
+        "error": str(e)
+    }
+
 @app.post("/research")
 async def research_endpoint(request: ResearchRequest):
     """
@@ -506,40 +712,43 @@ async def research_endpoint(request: ResearchRequest):
         if not request.question.strip():
             raise HTTPException(status_code=400, detail="Question cannot be empty")
         
-        print(f"[DEBUG] Running non-streaming research for: {request.question}")
+        logger.debug("Running non-streaming research for: %s", request.question)
         
-        # Collect all streaming results
-        final_result = None
-        async for update in research_workflow.stream_research(request.question):
-            if update.get("type") == "complete":
-                final_result = update.get("data", {})
+        final_result = await research_workflow.run_research(request.question)
         
         if final_result is None:
             raise HTTPException(status_code=500, detail="No final result received")
         
-        return {
-            "success": True,
-            "final_answer": final_result.get("final_answer", ""),
-            "citations": final_result.get("citations", []),
-            "research_summary": final_result.get("research_summary", {}),
-            "errors": final_result.get("errors", [])
-        }
+        return _research_response(final_result)
         
     except Exception as e:
-        return {
-            "success": False,
-            "final_answer": "Error occurred during research process.",
-            "citations": [],
-            "research_summary": {"error": str(e)},
-            "error": str(e)
-        }
+        return _research_error_response(e)
+
+@app.post("/research/batch")
+async def research_batch_endpoint(request: BatchResearchRequest):
+    """
+    Run several research questions concurrently without streaming; results are in request order
+    """
+    if any(not question.strip() for question in request.questions):
+        raise HTTPException(status_code=400, detail="Questions cannot be empty")
+
+    logger.debug("Running batch research for %d questions", len(request.questions))
+
+    results = await research_workflow.run_many(request.questions, request.concurrency)
+    return {
+        "results": [
+            _research_error_response(result) if isinstance(result, BaseException)
+            else _research_response(result)
+            for result in results
+        ]
+    }
 
 @app.post("/threads")
 async def create_thread():
     """
     Create a new thread for LangGraph SDK useStream hook.
     """
-    thread_id = str(uuid4())
+    thread_id = token_hex(16)
     return {"thread_id": thread_id}
 
 @app.post("/threads/{thread_id}/runs")
@@ -553,10 +762,9 @@ async def run_thread(thread_id: str, payload: Dict[str, Any]):
         raise HTTPException(status_code=400, detail="Missing messages in request")
     first = messages[0]
     question = first.get("content")
-    if not question:
+    if not question or not question.strip():
         raise HTTPException(status_code=400, detail="First message missing content")
-    # Delegate to the existing streaming research endpoint
-    return await research_stream_endpoint(ResearchRequest(question=question))
+    return _build_research_stream(question)
 
 # Allow SSE streaming via GET for EventSource (reads question from query params)
 @app.get("/threads/{thread_id}/runs")
@@ -565,14 +773,36 @@ async def run_thread_get(thread_id: str, question: str):
     """
     SSE endpoint for streaming research via thread with GET supporting EventSource.
     """
-    # Delegate to POST handler by constructing payload
-    payload = {"input": {"messages": [{"type": "human", "content": question}]}}
-    return await run_thread(thread_id, payload)
+    if not question.strip():
+        raise HTTPException(status_code=400, detail="Question cannot be empty")
+    return _build_research_stream(question)
+
+# uvloop + httptools give a faster event loop and HTTP parser for the SSE/WebSocket
+# hot path; fall back to uvicorn's defaults where uvloop is unavailable (e.g. Windows)
+try:
+    import uvloop  # noqa: F401
+    _SERVER_KWARGS = {"loop": "uvloop", "http": "httptools", "ws": "websockets"}
+except ImportError:
+    _SERVER_KWARGS = {}
+
+def default_worker_count() -> int:
+    """
+    Worker processes to run: WEB_CONCURRENCY if set, else 1. The LLM and semantic
+    caches, the search concurrency limit and /admin/reload are all per process, so
+    more workers are opt-in (REDIS_URL shares the LLM cache between them).
+    """
+    return int(os.getenv("WEB_CONCURRENCY", "1"))
 
-def start_server(host: str = "0.0.0.0", port: int = 8000, reload: bool = False):
+def start_server(host: str = "0.0.0.0", port: int = 8000, reload: bool = False,
+                 workers: Optional[int] = None):
     """Start the FastAPI server using uvicorn"""
-    print(f"[DEBUG] Starting server on {host}:{port} (reload={reload})")
-    uvicorn.run(app, host=host, port=port, reload=reload)
+    # Auto-reload runs a single process; otherwise fork the requested workers so
+    # CPU-heavy requests on one event loop don't stall every other client
+    workers = 1 if reload else (workers or default_worker_count())
+    logger.info("Starting server on %s:%s (reload=%s, workers=%s)", host, port, reload, workers)
+    # Workers and reload need an import string rather than the app instance
+    uvicorn.run(f"{__name__}:app", host=host, port=port, reload=reload, workers=workers,
+                **_SERVER_KWARGS)
 
 if __name__ == "__main__":
-    uvicorn.run(app, host="0.0.0.0", port=8000) 
\ No newline at end of file
+    uvicorn.run(app, host="0.0.0.0", port=8000, **_SERVER_KWARGS) 
\ No newline at end of file
@@ -0,0 +1,114 @@
+import logging
+import os
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+import orjson
+
+# Child of the API's "research" logger, so records share its queued handler and LOG_LEVEL
+logger = logging.getLogger("research.cache")
+
+Embedder = Callable[[str], Awaitable[List[float]]]
+
+
+def _normalize_text(text: str) -> str:
+    return " ".join(text.lower().split())
+
+
+class SemanticCache:
+    """
+    Nearest-neighbour cache of (embedding, payload) pairs, so a paraphrase of an
+    earlier query reuses its LLM output instead of making another call.
+
+    Lookups run in two stages: an exact match on the normalized text needs no
+    embedding call; otherwise the query is embedded and compared (cosine) to every
+    stored key. Only a neighbour at or above the threshold is a hit; anything in the
+    gray zone below it is treated as a miss to avoid returning a wrong answer.
+    """
+
+    def __init__(self, name: str, embed: Embedder, threshold: float = 0.92, directory: str = ""):
+        self.name = name
+        self.threshold = threshold
+        self._embed = embed
+        self._directory = directory
+        self._texts: Dict[str, int] = {}
+        self._payloads: List[Any] = []
+        self._vectors: Optional[np.ndarray] = None
+        self._dirty = False
+        if directory:
+            self._load()
+
+    def __len__(self) -> int:
+        return len(self._payloads)
+
+    def _paths(self) -> Tuple[str, str]:
+        base = os.path.join(self._directory, f"semantic_{self.name}")
+        return f"{base}.npy", f"{base}.json"
+
+    def _load(self) -> None:
+        vectors_path, payloads_path = self._paths()
+        if not (os.path.exists(vectors_path) and os.path.exists(payloads_path)):
+            return
+        try:
+            vectors = np.load(vectors_path)
+            with open(payloads_path, "rb") as f:
+                stored = orjson.loads(f.read())
+            if len(vectors) != len(stored["payloads"]):
+                raise ValueError("vector and payload counts differ")
+        except Exception as e:
+            logger.warning("Ignoring unreadable semantic cache %r: %s", self.name, e)
+            return
+        self._vectors = vectors
+        self._payloads = stored["payloads"]
+        self._texts = {text: i for i, text in enumerate(stored["texts"])}
+
+    def save(self) -> None:
+        """Write the cache to its directory if anything was added since the last save"""
+        if not (self._directory and self._dirty and self._vectors is not None):
+            return
+        os.makedirs(self._directory, exist_ok=True)
+        vectors_path, payloads_path = self._paths()
+        np.save(vectors_path, self._vectors)
+        with open(payloads_path, "wb") as f:
+            f.write(orjson.dumps({"texts": list(self._texts), "payloads": self._payloads}))
+        self._dirty = False
+
+    async def lookup(self, text: str) -> Tuple[Optional[Any], Optional[np.ndarray]]:
+        """
+        Return (payload, None) on a hit, or (None, embedding) on a miss so the caller
+        can add() its fresh result without embedding the text twice.
+        Embedding failures are logged and reported as a miss with no embedding.
+        """
+        index = self._texts.get(_normalize_text(text))
+        if index is not None:
+            return self._payloads[index], None
+
+        try:
+            vector = np.asarray(await self._embed(text), dtype=np.float32)
+        except Exception as e:
+            logger.warning("Semantic cache %r embedding failed: %s", self.name, e)
+            return None, None
+        vector /= np.linalg.norm(vector) or 1.0
+
+        if self._vectors is not None and self._vectors.shape[1] == vector.shape[0]:
+            similarities = self._vectors @ vector
+            best = int(np.argmax(similarities))
+            if similarities[best] >= self.threshold:
+                logger.debug("Semantic cache %r hit (similarity %.3f)", self.name, similarities[best])
+                return self._payloads[best], None
+        return None, vector
+
+    def add(self, text: str, vector: Optional[np.ndarray], payload: Any) -> None:
+        """Store a payload under the embedding returned by a missed lookup()"""
+        if vector is None:
+            return
+        if self._vectors is None or self._vectors.shape[1] != vector.shape[0]:
+            # First entry, or the embedding model changed: start over
+            self._vectors = vector[np.newaxis, :]
+            self._payloads = []
+            self._texts = {}
+        else:
+            self._vectors = np.vstack((self._vectors, vector))
+        self._texts[_normalize_text(text)] = len(self._payloads)
+        self._payloads.append(payload)
+        self._dirty = True
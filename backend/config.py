@@ -1,58 +1,121 @@
 import os
 from typing import Literal
-from dataclasses import dataclass, field
-from typing import List
+from dataclasses import dataclass, field, fields
+from typing import Tuple
 
-@dataclass
+@dataclass(slots=True)
 class ResearchAgentConfig:
-    """Configuration for the Research Agent (Google Gemini backend)"""
+    """Configuration for the Research Agent (Google Gemini backend)
+
+    Treat as read-only: fields change only when reload_config() refreshes the
+    shared instance, so read a value once if it must stay fixed across an await.
+    Derived flags are computed in __post_init__.
+    """
 
     # Mode selection — false by default so real research runs without manual override
-    demo_mode: bool = os.getenv("DEMO_MODE", "false").lower() == "true"
+    demo_mode: bool = field(default_factory=lambda: os.getenv("DEMO_MODE", "false").lower() == "true")
 
     # ── Google AI / Gemini models ────────────────────────────────────────────
-    # gemini-2.0-flash is fast and capable; use gemini-1.5-pro for higher quality
-    query_generator_model: str = "gemini-3-flash-preview"  # Query generation
-    web_searcher_model: str = "gemini-3-flash-preview"     # Web search analysis
-    reflection_model: str = "gemini-3-flash-preview"       # Reflection / gap analysis
-    answer_model: str = "gemini-3-flash-preview"           # Final answer synthesis
+    # Sized per task: query planning and reflection are short structured outputs,
+    # so they run on the cheaper, lower-latency flash-lite; search synthesis and
+    # the final answer need the stronger model. Each can be overridden via env.
+    query_generator_model: str = field(default_factory=lambda: os.getenv("QUERY_GENERATOR_MODEL", "gemini-2.5-flash-lite"))  # Query generation
+    web_searcher_model: str = field(default_factory=lambda: os.getenv("WEB_SEARCHER_MODEL", "gemini-3-flash-preview"))  # Web search analysis
+    reflection_model: str = field(default_factory=lambda: os.getenv("REFLECTION_MODEL", "gemini-2.5-flash-lite"))  # Reflection / gap analysis
+    answer_model: str = field(default_factory=lambda: os.getenv("ANSWER_MODEL", "gemini-3-flash-preview"))  # Final answer synthesis
 
     # ── Research Parameters ──────────────────────────────────────────────────
     initial_queries_count: int = 3
     max_research_loops: int = 2
     max_sources_per_query: int = 10
+    # Results passed to the answer prompt; larger runs keep the ones most similar
+    # to the question (embedding similarity). 0 passes every result.
+    answer_top_k: int = field(default_factory=lambda: int(os.getenv("ANSWER_TOP_K", "8")))
+    # Upper bound on the findings text in a reflection/answer prompt (~4 chars per
+    # token), so an oversized run is trimmed locally instead of failing at the API
+    max_prompt_findings_chars: int = field(default_factory=lambda: int(os.getenv("MAX_PROMPT_FINDINGS_CHARS", "400000")))
 
     # ── Performance Settings ─────────────────────────────────────────────────
     search_timeout_seconds: int = 30
-    parallel_search_limit: int = 5
+    parallel_search_limit: int = 5  # Max concurrent web_search LLM calls
+    # Search all queries of a round in one Gemini call instead of one call per query
+    search_batching_enabled: bool = field(default_factory=lambda: os.getenv("SEARCH_BATCHING_ENABLED", "false").lower() == "true")
 
     # ── Quality Thresholds ───────────────────────────────────────────────────
+    # After a follow-up loop, at least this many sources and summary characters
+    # count as sufficient without asking the reflection model
     min_sources_for_sufficiency: int = 5
+    min_summary_chars_for_sufficiency: int = 4000
     content_relevance_threshold: float = 0.7
 
+    # ── LLM response cache ───────────────────────────────────────────────────
+    # SQLite file for cached Gemini responses (empty disables); REDIS_URL, when set,
+    # takes precedence so multiple server workers share one cache
+    llm_cache_path: str = field(default_factory=lambda: os.getenv(
+        "LLM_CACHE_PATH", os.path.join(os.path.dirname(__file__), ".cache", "langchain.db")
+    ))
+    redis_url: str = field(default_factory=lambda: os.getenv("REDIS_URL", ""))
+
+    # ── Semantic cache ───────────────────────────────────────────────────────
+    # Reuse query plans and search results for paraphrased questions/queries, matched
+    # by embedding cosine similarity; persisted under semantic_cache_dir at shutdown
+    semantic_cache_enabled: bool = field(default_factory=lambda: os.getenv("SEMANTIC_CACHE_ENABLED", "false").lower() == "true")
+    semantic_cache_threshold: float = field(default_factory=lambda: float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.92")))
+    semantic_cache_dir: str = field(default_factory=lambda: os.getenv(
+        "SEMANTIC_CACHE_DIR", os.path.join(os.path.dirname(__file__), ".cache")
+    ))
+    embedding_model: str = field(default_factory=lambda: os.getenv("EMBEDDING_MODEL", "gemini-embedding-001"))
+
     # ── API Configuration ────────────────────────────────────────────────────
-    google_ai_api_key: str = os.getenv("GOOGLE_AI_API_KEY", "")
+    google_ai_api_key: str = field(default_factory=lambda: os.getenv("GOOGLE_AI_API_KEY", ""))
 
     # ── CORS origins (comma-separated list via env var) ──────────────────────
-    cors_origins: List[str] = field(default_factory=lambda: [
+    cors_origins: Tuple[str, ...] = field(default_factory=lambda: tuple(
         o.strip()
         for o in os.getenv(
             "CORS_ORIGINS",
             "http://localhost:5173,http://localhost:3000"
         ).split(",")
         if o.strip()
-    ])
+    ))
+
+    # ── Derived (computed once at construction) ──────────────────────────────
+    google_ai_api_key_configured: bool = field(init=False)
+
+    def __post_init__(self):
+        self.google_ai_api_key_configured = bool(self.google_ai_api_key.strip())
 
     def validate(self) -> bool:
         """Validate that required API keys are present or demo mode is enabled"""
-        if self.demo_mode:
-            return True
-        return bool(self.google_ai_api_key.strip())
+        return self.demo_mode or self.google_ai_api_key_configured
 
 
 # Global config instance
 config = ResearchAgentConfig()
 
+
+def reload_config() -> ResearchAgentConfig:
+    """Re-read the environment into the global config instance in place.
+
+    Modules bind ``config`` at import, so the fields are copied onto the
+    existing object rather than rebinding the name; this is why the class is
+    not frozen. Settings consumed once at startup (caches, CORS, graph shape,
+    search concurrency) still need a restart to take effect.
+    """
+    fresh = ResearchAgentConfig()
+    for f in fields(ResearchAgentConfig):
+        setattr(config, f.name, getattr(fresh, f.name))
+    return config
+
 # Timeline phase types
 TimelinePhase = Literal["generating_queries", "search_web", "reflection", "generating_answer"]
+
+
+class Phase:
+    """Timeline phase names, shared so every module reports the same string objects"""
+    GENERATING_QUERIES: TimelinePhase = "generating_queries"
+    SEARCH_WEB: TimelinePhase = "search_web"
+    REFLECTION: TimelinePhase = "reflection"
+    GENERATING_ANSWER: TimelinePhase = "generating_answer"
+
 NodeStatus = Literal["pending", "in_progress", "completed", "error"]
\ No newline at end of file
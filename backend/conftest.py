@@ -2,4 +2,4 @@ import os
 import sys
  
 # Ensure tests can import modules from the backend package
-sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "backend"))) 
\ No newline at end of file
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__))) 
\ No newline at end of file
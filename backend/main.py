@@ -1,57 +1,83 @@
 import asyncio
 import argparse
 import json
+import logging
 import os
-import sys
 from typing import Optional
 from dotenv import load_dotenv
 import pathlib
 
-# Add parent directory to path to ensure imports work correctly
-sys.path.insert(0, os.path.abspath(os.path.dirname(os.path.dirname(__file__))))
-
 # Initialize LangSmith for tracing and debugging
-try:
-    from langsmith_setup import langsmith_enabled
-except ImportError:
-    from backend.langsmith_setup import langsmith_enabled
+from backend.langsmith_setup import langsmith_enabled
+
+from backend.workflow import run_research_agent, workflow_instance
+from backend.nodes import save_semantic_caches
+from backend.config import config
+from backend.api import start_server
 
-# Use try-except to handle both import paths
+# Run CLI coroutines on uvloop where available (the server gets it via start_server)
 try:
-    # Direct imports (when running from backend dir)
-    from workflow import run_research_agent
-    from config import config
-    from api import start_server
+    import uvloop
+    _run_async = uvloop.run
 except ImportError:
-    # Prefixed imports (when running from project root)
-    from backend.workflow import run_research_agent
-    from backend.config import config
-    from backend.api import start_server
+    _run_async = asyncio.run
 
 # Load environment variables — try backend/.env first, then project root .env
 _env_path = pathlib.Path(__file__).parent / ".env"
 load_dotenv(dotenv_path=_env_path if _env_path.exists() else None, override=False)
 
+logging.basicConfig(level=os.getenv("LOG_LEVEL", "WARNING").upper())
+
 async def run_cli_research(question: str, verbose: bool = False):
     """Run research from command line interface"""
     
     print(f"🔍 Starting research for: {question}")
     print("=" * 60)
     
-    # Progress callback for CLI
-    async def cli_progress_callback(update):
+    # Progress updates are queued and printed by a separate task, so graph nodes
+    # never wait on terminal output
+    progress_q: asyncio.Queue = asyncio.Queue(maxsize=256)
+
+    def print_progress(update):
+        # Answer tokens are printed inline as they stream
+        if "delta" in update:
+            print(update["delta"], end="", flush=True)
+            return
+        phase = update.get("phase") or update.get("node", "")
         if verbose:
-            print(f"[{update['phase'].upper()}] {update.get('progress_message', update.get('completion_message', ''))}")
+            print(f"[{phase.upper()}] {update.get('progress_message', update.get('completion_message', ''))}")
         else:
             # Simple progress indicators
-            if update['status'] == 'completed':
-                print(f"✅ {update['phase'].replace('_', ' ').title()}")
+            if update.get('status') == 'completed':
+                print(f"✅ {phase.replace('_', ' ').title()}")
             elif update.get('progress_message'):
                 print(f"⏳ {update['progress_message']}")
+
+    async def drain_progress():
+        while True:
+            update = await progress_q.get()
+            try:
+                print_progress(update)
+            except Exception:
+                # A malformed update must not stop the printer
+                pass
+            finally:
+                progress_q.task_done()
+
+    async def cli_progress_callback(update):
+        try:
+            progress_q.put_nowait(update)
+        except asyncio.QueueFull:
+            # Answer tokens are never dropped; status updates are when the printer lags
+            if "delta" in update:
+                await progress_q.put(update)
+
+    printer = asyncio.create_task(drain_progress())
     
     try:
         # Run the research
         result = await run_research_agent(question, cli_progress_callback)
+        await progress_q.join()
         
         print("\n" + "=" * 60)
         
@@ -88,9 +114,51 @@ async def run_cli_research(question: str, verbose: bool = False):
     except Exception as e:
         print(f"❌ Fatal Error: {str(e)}")
         return False
+    finally:
+        printer.cancel()
     
     return result["success"]
 
+async def run_cli_research_batch(input_path: str, concurrency: int) -> bool:
+    """Run every question in a file (one per line) concurrently and print each answer"""
+    questions = [line.strip() for line in pathlib.Path(input_path).read_text().splitlines() if line.strip()]
+    if not questions:
+        print(f"❌ No questions found in {input_path}")
+        return False
+
+    print(f"🔍 Starting batch research for {len(questions)} questions (concurrency {concurrency})")
+    print("=" * 60)
+
+    results = await workflow_instance.run_many(questions, concurrency)
+
+    all_succeeded = True
+    for i, (question, result) in enumerate(zip(questions, results), 1):
+        print(f"\n[{i}/{len(questions)}] {question}")
+        print("-" * 40)
+        if isinstance(result, BaseException):
+            print(f"❌ Research Failed: {result}")
+            all_succeeded = False
+        else:
+            print(result.get("final_answer", ""))
+            print(f"\n📚 Sources: {len(result.get('citations', []))}")
+    return all_succeeded
+
+def check_models() -> bool:
+    """Check that every configured node model is available to the API key"""
+    from google import genai
+
+    client = genai.Client(api_key=config.google_ai_api_key)
+    all_available = True
+    for name in dict.fromkeys((config.query_generator_model, config.web_searcher_model,
+                               config.reflection_model, config.answer_model)):
+        try:
+            client.models.get(model=name)
+            print(f"✅ Model available: {name}")
+        except Exception as e:
+            print(f"❌ Model unavailable: {name} ({e})")
+            all_available = False
+    return all_available
+
 def validate_environment():
     """Validate required environment variables"""
     required_vars = ["GOOGLE_AI_API_KEY"]
@@ -117,12 +185,19 @@ def main():
     research_parser = subparsers.add_parser("research", help="Run research on a question")
     research_parser.add_argument("question", help="The research question")
     research_parser.add_argument("--verbose", "-v", action="store_true", help="Verbose output")
+
+    # Batch research command
+    batch_parser = subparsers.add_parser("research-batch", help="Run research on many questions concurrently")
+    batch_parser.add_argument("--input", "-i", required=True, help="File with one question per line")
+    batch_parser.add_argument("--concurrency", "-c", type=int, default=4, help="Research runs in flight at once")
     
     # Server command
     server_parser = subparsers.add_parser("server", help="Start API server")
     server_parser.add_argument("--host", default="0.0.0.0", help="Server host")
     server_parser.add_argument("--port", type=int, default=8000, help="Server port")
     server_parser.add_argument("--reload", action="store_true", help="Enable auto-reload")
+    server_parser.add_argument("--workers", type=int, default=None,
+                               help="Worker processes (default: WEB_CONCURRENCY or 1)")
     
     # Config command
     config_parser = subparsers.add_parser("config", help="Check configuration")
@@ -143,7 +218,13 @@ def main():
     
     if args.command == "research":
         # Run research
-        success = asyncio.run(run_cli_research(args.question, args.verbose))
+        success = _run_async(run_cli_research(args.question, args.verbose))
+        save_semantic_caches()
+        exit(0 if success else 1)
+    
+    elif args.command == "research-batch":
+        success = _run_async(run_cli_research_batch(args.input, args.concurrency))
+        save_semantic_caches()
         exit(0 if success else 1)
     
     elif args.command == "server":
@@ -152,9 +233,10 @@ def main():
         print(f"   Host: {args.host}")
         print(f"   Port: {args.port}")
         print(f"   Reload: {args.reload}")
+        print(f"   Workers: {args.workers or 'default'}")
         print(f"   URL: http://{args.host}:{args.port}")
         
-        start_server(args.host, args.port, args.reload)
+        start_server(args.host, args.port, args.reload, args.workers)
     
     elif args.command == "config":
         # Check configuration
@@ -181,8 +263,12 @@ def main():
         # Run quick test
         test_question = "What is the current population of Tokyo?"
         print(f"🧪 Running quick test with question: {test_question}")
+
+        if not check_models():
+            print("\n❌ Test failed: configured models are unavailable!")
+            exit(1)
         
-        success = asyncio.run(run_cli_research(test_question, verbose=True))
+        success = _run_async(run_cli_research(test_question, verbose=True))
         
         if success:
             print("\n✅ Test completed successfully!")
@@ -1,21 +1,73 @@
 import asyncio
-import json
-import re
+import logging
 import os
+import time
+import weakref
 from datetime import datetime
-from typing import Dict, Any, List, Optional
-from langchain_core.messages import HumanMessage
-from langchain_google_genai import ChatGoogleGenerativeAI
-
-from backend.state import OverallState, SearchResult, WebSearchState
+from functools import lru_cache
+from itertools import chain
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence, Tuple, Type
+import numpy as np
+from pydantic import BaseModel
+from langchain_core.exceptions import ModelAPIError, ModelRateLimitError, OutputParserException
+from langchain_core.globals import set_llm_cache
+from langchain_core.messages import BaseMessage, HumanMessage, SystemMessage
+from langchain_core.messages.ai import AIMessageChunk, add_ai_message_chunks
+from langchain_core.runnables import Runnable
+from langchain_google_genai import ChatGoogleGenerativeAI, GoogleGenerativeAIEmbeddings
+from langgraph.config import get_config
+from tenacity import AsyncRetrying, retry_if_exception, stop_after_attempt, wait_exponential
+
+from backend.state import (
+    OverallState, SearchResult, WebSearchState, QueryPlan, Reflection, BatchSearchResults
+)
 from backend.search_utils import extract_urls_from_text
+from backend.cache import SemanticCache
 from backend.prompts import (
     QUERY_GENERATION_SYSTEM_PROMPT, QUERY_GENERATION_USER_TEMPLATE,
     REFLECTION_SYSTEM_PROMPT, REFLECTION_USER_TEMPLATE,
     ANSWER_GENERATION_SYSTEM_PROMPT, ANSWER_GENERATION_USER_TEMPLATE,
-    format_search_results_for_reflection, format_search_results_for_answer, format_sources_list
+    WEB_SEARCH_SYSTEM_PROMPT, WEB_SEARCH_USER_TEMPLATE,
+    WEB_SEARCH_BATCH_SYSTEM_PROMPT, WEB_SEARCH_BATCH_USER_TEMPLATE,
+    format_reflection_entry, format_search_results_for_answer, format_sources_list, truncate_findings
 )
-from backend.config import config
+from backend.config import Phase, config
+
+
+# Child of the API's "research" logger, so records share its queued handler and LOG_LEVEL
+logger = logging.getLogger("research.nodes")
+
+
+def _configure_llm_cache() -> None:
+    """Install the process-wide LLM response cache so repeated prompts skip the network"""
+    if config.redis_url:
+        import redis
+        from langchain_community.cache import RedisCache
+        set_llm_cache(RedisCache(redis.Redis.from_url(config.redis_url)))
+    elif config.llm_cache_path:
+        from langchain_community.cache import SQLiteCache
+        os.makedirs(os.path.dirname(config.llm_cache_path) or ".", exist_ok=True)
+        set_llm_cache(SQLiteCache(database_path=config.llm_cache_path))
+
+
+_configure_llm_cache()
+
+# Caps concurrent Gemini search calls across the parallel web_search branches
+# fanned out by the workflow (one Send per query). One semaphore per event loop,
+# created on first use, so separate loops (tests, asyncio.run per request) never
+# share one bound to another loop.
+_search_semaphores: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Semaphore]" = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def _search_semaphore() -> asyncio.Semaphore:
+    """Search concurrency limit for the running event loop"""
+    loop = asyncio.get_running_loop()
+    semaphore = _search_semaphores.get(loop)
+    if semaphore is None:
+        semaphore = _search_semaphores[loop] = asyncio.Semaphore(config.parallel_search_limit)
+    return semaphore
 
 
 def _content_to_str(content) -> str:
@@ -45,16 +97,179 @@ def _content_to_str(content) -> str:
     return str(content)
 
 
-def get_llm(model_name: str = None) -> ChatGoogleGenerativeAI:
-    """Get configured Google Gemini language model"""
-    model = model_name or config.query_generator_model
-    return ChatGoogleGenerativeAI(
-        model=model,
-        google_api_key=config.google_ai_api_key,
-        temperature=0.2,
+# One ChatGoogleGenerativeAI per (model, temperature): every node (and every
+# structured-output binding) on the same model shares its client and HTTP pool
+_CHAT_MODELS: Dict[Tuple[str, float], ChatGoogleGenerativeAI] = {}
+
+
+def _chat_model(model: str, temperature: float) -> ChatGoogleGenerativeAI:
+    """Get the shared chat model instance for a model name and temperature"""
+    key = (model, temperature)
+    llm = _CHAT_MODELS.get(key)
+    if llm is None:
+        llm = _CHAT_MODELS[key] = ChatGoogleGenerativeAI(
+            model=model,
+            # Read at construction so reset_llm_clients() picks up a rotated key
+            google_api_key=os.getenv("GOOGLE_AI_API_KEY") or config.google_ai_api_key,
+            temperature=temperature,
+        )
+    return llm
+
+
+@lru_cache(maxsize=None)
+def get_llm(
+    model_name: str = None,
+    schema: Optional[Type[BaseModel]] = None,
+    temperature: float = 0.2,
+) -> Runnable:
+    """
+    Get configured Google Gemini language model. With a schema, Gemini's native JSON
+    schema mode constrains the output to it and a parsed schema instance is returned.
+    Runnables are memoized per (model, schema, temperature) on top of the shared chat models.
+    """
+    llm = _chat_model(model_name or config.query_generator_model, temperature)
+    if schema is not None:
+        return llm.with_structured_output(schema, method="json_schema")
+    return llm
+
+
+_EMBEDDINGS: Dict[str, GoogleGenerativeAIEmbeddings] = {}
+
+
+def _embeddings_client() -> GoogleGenerativeAIEmbeddings:
+    """Get the shared embeddings client for the configured embedding model"""
+    embeddings = _EMBEDDINGS.get(config.embedding_model)
+    if embeddings is None:
+        embeddings = _EMBEDDINGS[config.embedding_model] = GoogleGenerativeAIEmbeddings(
+            model=config.embedding_model,
+            google_api_key=os.getenv("GOOGLE_AI_API_KEY") or config.google_ai_api_key,
+        )
+    return embeddings
+
+
+async def _embed(text: str) -> List[float]:
+    """Embed text for semantic cache lookups"""
+    return await _embeddings_client().aembed_query(text, task_type="SEMANTIC_SIMILARITY")
+
+
+def _semantic_cache(name: str) -> Optional[SemanticCache]:
+    if not config.semantic_cache_enabled:
+        return None
+    return SemanticCache(name, _embed, config.semantic_cache_threshold, config.semantic_cache_dir)
+
+
+# Paraphrased questions reuse their query plan, paraphrased queries their search summary
+_query_cache = _semantic_cache("queries")
+_search_cache = _semantic_cache("searches")
+
+
+def save_semantic_caches() -> None:
+    """Persist the semantic caches to disk; call once at shutdown"""
+    for cache in (_query_cache, _search_cache):
+        if cache is not None:
+            cache.save()
+
+
+def reset_llm_clients() -> None:
+    """
+    Drop the cached models so the next get_llm() builds fresh clients (e.g. after
+    an API key change). In-flight calls keep their instances until they finish.
+    """
+    _CHAT_MODELS.clear()
+    _EMBEDDINGS.clear()
+    get_llm.cache_clear()
+
+
+async def close_llm_clients() -> None:
+    """Close the shared chat model and embeddings HTTP clients; call once at shutdown"""
+    for llm in _CHAT_MODELS.values():
+        await llm.aclose()
+    for embeddings in _EMBEDDINGS.values():
+        await embeddings.client.aio.aclose()
+    reset_llm_clients()
+
+
+_RETRYABLE_ERRORS = (ModelRateLimitError, ModelAPIError)
+
+
+def _retrying(retryable: Callable[[BaseException], bool]) -> AsyncRetrying:
+    """Shared backoff policy for Gemini calls: up to 4 attempts, exponential wait capped at 30s"""
+    return AsyncRetrying(
+        stop=stop_after_attempt(4),
+        wait=wait_exponential(multiplier=1, max=30),
+        retry=retry_if_exception(retryable),
+        reraise=True,
     )
 
 
+async def _invoke_with_retry(llm: Runnable, messages: Sequence[BaseMessage]) -> Any:
+    """
+    Invoke an LLM, retrying rate limits (429) and Gemini server errors with
+    exponential backoff. Other failures, including parse errors, raise immediately.
+    """
+    async for attempt in _retrying(lambda e: isinstance(e, _RETRYABLE_ERRORS)):
+        with attempt:
+            return await llm.ainvoke(messages)
+
+
+async def _stream_with_retry(
+    llm: Runnable,
+    messages: Sequence[BaseMessage],
+    on_delta: Optional[Callable[[str], Awaitable[None]]] = None,
+) -> AIMessageChunk:
+    """
+    Stream an LLM response, passing each text delta to on_delta, and return the
+    merged message. Rate limits and server errors are retried like
+    _invoke_with_retry, but only until the first token is emitted; after that a
+    restart would duplicate text the caller has already seen.
+    """
+    emitted = False
+    async for attempt in _retrying(lambda e: not emitted and isinstance(e, _RETRYABLE_ERRORS)):
+        with attempt:
+            chunks: List[AIMessageChunk] = []
+            async for chunk in llm.astream(messages):
+                chunks.append(chunk)
+                delta = _content_to_str(chunk.content)
+                if delta:
+                    emitted = True
+                    if on_delta is not None:
+                        await on_delta(delta)
+    if not chunks:
+        raise ValueError("Answer model returned an empty stream")
+    # Merge once at the end; adding chunk by chunk re-copies the content each time
+    return add_ai_message_chunks(*chunks)
+
+
+@lru_cache(maxsize=None)
+def _system_message(system_prompt: str) -> SystemMessage:
+    """Shared SystemMessage per static system prompt"""
+    return SystemMessage(content=system_prompt)
+
+
+def _build_messages(system_prompt: str, user_template: str, **fields: Any) -> Tuple[BaseMessage, ...]:
+    """
+    System prompt as its own leading message, filled-in user template last, so every
+    call on a node starts with the same bytes and hits Gemini's implicit prefix cache
+    """
+    return _system_message(system_prompt), HumanMessage(content=user_template.format(**fields))
+
+
+@lru_cache(maxsize=128)
+def _query_generation_messages(question: str) -> Tuple[BaseMessage, ...]:
+    """Query generation messages; cached since every research loop re-asks the same question"""
+    return _build_messages(QUERY_GENERATION_SYSTEM_PROMPT, QUERY_GENERATION_USER_TEMPLATE, question=question)
+
+
+def _get_progress_callback():
+    """Return the progress_callback passed in the run's configurable, if any"""
+    try:
+        run_config = get_config()
+    except RuntimeError:
+        # Called outside a graph run (e.g. directly from tests)
+        return None
+    return run_config.get("configurable", {}).get("progress_callback")
+
+
 async def generate_queries_node(state: OverallState) -> Dict[str, Any]:
     """
     Phase 1: Generate targeted search queries from user question
@@ -64,57 +279,46 @@ async def generate_queries_node(state: OverallState) -> Dict[str, Any]:
         if not question and state.get("messages"):
             question = state["messages"][0].content if hasattr(state["messages"][0], "content") else str(state["messages"][0])
 
-        print(f"[DEBUG] Generating queries for: {question}")
-
-        llm = get_llm(config.query_generator_model)
-        prompt = f"{QUERY_GENERATION_SYSTEM_PROMPT}\n\n{QUERY_GENERATION_USER_TEMPLATE.format(question=question)}"
-
-        response = await llm.ainvoke([HumanMessage(content=prompt)])
-
-        # Parse response
-        try:
-            content = _content_to_str(response.content)
-            # Strip markdown code fences if present
-            if '```' in content:
-                content = re.sub(r'```(?:json)?\s*', '', content).strip()
-            # Extract JSON object from response text
-            if '{' in content and '}' in content:
-                start = content.find('{')
-                end = content.rfind('}')
-                if start < end:
-                    content = content[start:end + 1]
-
-            parsed = json.loads(content)
-            queries = parsed.get("queries", [])
-
-            # Fallback: look for any list of strings
-            if not queries:
-                for key, value in parsed.items():
-                    if isinstance(value, list) and all(isinstance(q, str) for q in value):
-                        queries = value
-                        break
-
-            if not queries:
-                queries = [f"{question} research", f"{question} analysis", f"{question} overview"]
-
-            rationale = parsed.get("rationale", parsed.get("thought", parsed.get("reasoning", "Generated research queries")))
-        except (json.JSONDecodeError, AttributeError, TypeError) as e:
-            print(f"[DEBUG] JSON parsing failed in query generation: {e}")
+        logger.debug("Generating queries for: %s", question)
+
+        cached = vector = None
+        if _query_cache is not None:
+            cached, vector = await _query_cache.lookup(question)
+
+        plan = None
+        if cached is None:
+            llm = get_llm(config.query_generator_model, schema=QueryPlan)
+            messages = _query_generation_messages(question)
+
+            try:
+                plan = await _invoke_with_retry(llm, messages)
+            except OutputParserException as e:
+                logger.debug("Structured output parsing failed in query generation: %s", e)
+
+        if cached is not None:
+            queries = cached["queries"]
+            rationale = cached["rationale"]
+        elif plan is not None and plan.queries:
+            queries = plan.queries
+            rationale = plan.rationale or "Generated research queries"
+            if _query_cache is not None:
+                _query_cache.add(question, vector, {"queries": queries, "rationale": rationale})
+        else:
             queries = [f"{question} research", f"{question} analysis", f"{question} overview"]
             rationale = "Generated basic research queries"
 
         queries = queries[:config.initial_queries_count]
-        print(f"[DEBUG] Generated {len(queries)} queries: {queries}")
+        logger.debug("Generated %d queries: %s", len(queries), queries)
 
         return {
             "query_list": queries,
             "rationale": rationale,
             "original_question": question,
-            "current_phase": "search_web"
+            "current_phase": Phase.SEARCH_WEB
         }
 
     except Exception as e:
-        print(f"[ERROR] Query generation failed: {str(e)}")
+        logger.error("Query generation failed: %s", e)
         question = state.get("original_question", "research topic")
         return {
             "errors": [f"Query generation failed: {str(e)}"],
@@ -125,22 +329,24 @@ async def generate_queries_node(state: OverallState) -> Dict[str, Any]:
 
 
 
+def _clock() -> Tuple[int, str]:
+    """Read the clock once for a result: (nanosecond id stamp, ISO timestamp)"""
+    ns = time.time_ns()
+    return ns, datetime.fromtimestamp(ns / 1e9).isoformat()
+
+
 async def web_search_node(state: WebSearchState) -> Dict[str, Any]:
     """
     Phase 2: Execute web search using Gemini's built-in knowledge + grounding
     Note: Gemini can leverage Google Search grounding when enabled, but the base
     model is also highly capable of synthesising recent knowledge.
     """
-    import traceback
-    print("\n[DEBUG] Starting web_search_node execution...")
-
     query = ""
-    task_id = f"task-{datetime.now().strftime('%Y%m%d%H%M%S')}"
+    task_id = state.get("task_id") or f"task-{time.time_ns()}"
     original_question = ""
 
     try:
         query = state.get("query") or state.get("current_query") or state.get("original_question", "")
-        task_id = state.get("task_id", task_id)
         original_question = state.get("original_question", query)
 
         if not query:
@@ -152,40 +358,41 @@ async def web_search_node(state: WebSearchState) -> Dict[str, Any]:
         if not query:
             query = "General research query"
 
-        print(f"[DEBUG] Starting web search for query: {query}")
-
-        # Use Gemini to synthesise search results
-        llm = get_llm(config.web_searcher_model)
+        logger.debug("Starting web search for query: %s", query)
 
-        search_prompt = f"""You are a research assistant with access to comprehensive knowledge up to your training cutoff. 
-Search for and synthesise information about: {query}
+        cached = vector = None
+        if _search_cache is not None:
+            cached, vector = await _search_cache.lookup(query)
 
-Please provide:
-1. A comprehensive summary of key findings (2-3 paragraphs)
-2. Specific facts, statistics, and data points
-3. Different perspectives or approaches where relevant
-4. Recent developments or trends if applicable
-5. Reliable source URLs you are referencing (cite specific websites, papers, or articles)
+        if cached is not None:
+            search_content = cached["summary"]
+        else:
+            # Use Gemini to synthesise search results
+            llm = get_llm(config.web_searcher_model)
 
-Be thorough, accurate, and cite specific sources where possible."""
+            messages = _build_messages(WEB_SEARCH_SYSTEM_PROMPT, WEB_SEARCH_USER_TEMPLATE, query=query)
 
-        response = await llm.ainvoke([HumanMessage(content=search_prompt)])
-        search_content = _content_to_str(response.content)
+            async with _search_semaphore():
+                response = await _invoke_with_retry(llm, messages)
+            search_content = _content_to_str(response.content)
+            if _search_cache is not None:
+                _search_cache.add(query, vector, {"summary": search_content})
 
         # Extract any URLs mentioned in the response
         urls = extract_urls_from_text(search_content)
 
+        ns, timestamp = _clock()
         search_result = SearchResult(
-            id=f"search-{datetime.now().strftime('%Y%m%d%H%M%S')}-{task_id}",
+            id=f"search-{ns}-{task_id}",
             query=query,
             summary=search_content,
-            sources=urls,
+            sources=tuple(urls),
             task_id=task_id,
             relevance_score=0.9,
-            timestamp=datetime.now().isoformat()
+            timestamp=timestamp
         )
 
-        print(f"[DEBUG] Web search completed for query: {query}, found {len(urls)} source URLs")
+        logger.debug("Web search completed for query: %s, found %d source URLs", query, len(urls))
 
         return {
             "search_results": [search_result],
@@ -193,111 +400,186 @@ Be thorough, accurate, and cite specific sources where possible."""
         }
 
     except Exception as e:
-        print(f"[ERROR] Web search failed for query '{query}': {str(e)}")
-        traceback.print_exc()
-
-        error_result = SearchResult(
-            id=f"error-{datetime.now().strftime('%Y%m%d%H%M%S')}-{task_id}",
-            query=query,
-            summary=str(e),
-            sources=[],
-            task_id=task_id,
-            relevance_score=0.0,
-            timestamp=datetime.now().isoformat()
-        )
+        logger.exception("Web search failed for query %r", query)
+        return _search_error_output(query, task_id, e)
+
+
+def _search_error_output(query: str, task_id: str, error: BaseException) -> Dict[str, Any]:
+    """State update recording a failed search as an error SearchResult"""
+    ns, timestamp = _clock()
+    error_result = SearchResult(
+        id=f"error-{ns}-{task_id}",
+        query=query,
+        summary=str(error),
+        sources=(),
+        task_id=task_id,
+        relevance_score=0.0,
+        timestamp=timestamp
+    )
 
-        return {
-            "search_results": [error_result],
-            "sources_gathered": [],
-            "errors": [f"Web search failed: {str(e)}"]
-        }
+    return {
+        "search_results": [error_result],
+        "sources_gathered": [],
+        "errors": [f"Web search failed: {str(error)}"]
+    }
 
 
-async def aggregate_search_results(state: OverallState) -> Dict[str, Any]:
+async def run_searches(
+    queries: List[str], task_ids: List[str], original_question: str, is_followup: bool = False
+) -> Dict[str, Any]:
+    """
+    Run web_search_node for every query concurrently (bounded by _search_semaphore())
+    and merge their outputs into one state update. A search that raises, rather
+    than returning its own error result, is recorded as an error SearchResult.
+    """
+    outputs = await asyncio.gather(*(
+        web_search_node({
+            "query": query,
+            "task_id": task_id,
+            "original_question": original_question,
+            "is_followup": is_followup
+        })
+        for query, task_id in zip(queries, task_ids)
+    ), return_exceptions=True)
+    outputs = [
+        _search_error_output(query, task_id, out) if isinstance(out, BaseException) else out
+        for query, task_id, out in zip(queries, task_ids, outputs)
+    ]
+    return {
+        "search_results": [r for out in outputs for r in out["search_results"]],
+        "sources_gathered": [u for out in outputs for u in out["sources_gathered"]],
+        "errors": [e for out in outputs for e in out.get("errors", ())]
+    }
+
+
+async def web_search_batch_node(state: OverallState) -> Dict[str, Any]:
     """
-    Phase 3: Aggregate and deduplicate search results from parallel searches
+    Phase 2 (batched): search every query of the current round in a single Gemini call.
+    Used instead of the per-query fan-out when config.search_batching_enabled is set;
+    falls back to parallel web_search_node calls if the batched response is unusable.
     """
+    follow_up_queries = state.get("follow_up_queries", [])
+    if follow_up_queries:
+        queries = follow_up_queries
+        task_prefix = f"followup_{state.get('research_loop_count', 1)}"
+    else:
+        queries = state.get("query_list", [])
+        task_prefix = "initial"
+    original_question = state.get("original_question", "")
+    task_ids = [f"{task_prefix}_{i}" for i in range(len(queries))]
+
+    logger.debug("Starting batched web search for %d queries", len(queries))
+
+    batch = None
     try:
-        search_results = state.get("search_results", [])
-        sources_gathered = state.get("sources_gathered", [])
-
-        print(f"[DEBUG] Aggregating {len(search_results)} search results")
-
-        # Flatten nested results
-        flattened_results = []
-        for result in search_results:
-            if isinstance(result, dict):
-                flattened_results.append(result)
-            elif isinstance(result, list):
-                flattened_results.extend(result)
-
-        # Deduplicate sources
-        all_sources: set = set()
-        for source_entry in sources_gathered:
-            if isinstance(source_entry, list):
-                all_sources.update(source_entry)
-            elif isinstance(source_entry, str):
-                all_sources.add(source_entry)
-
-        total_queries_run = state.get("total_queries_run", 0) + len(flattened_results)
-
-        print(f"[DEBUG] Aggregated {len(flattened_results)} results from {len(all_sources)} sources")
+        llm = get_llm(config.web_searcher_model, schema=BatchSearchResults)
+        messages = _build_messages(
+            WEB_SEARCH_BATCH_SYSTEM_PROMPT, WEB_SEARCH_BATCH_USER_TEMPLATE,
+            queries="\n".join(f"{i + 1}. {q}" for i, q in enumerate(queries))
+        )
+        batch = await _invoke_with_retry(llm, messages)
+    except Exception as e:
+        logger.debug("Batched web search failed, searching per query: %s", e)
+
+    if batch is None or len(batch.results) != len(queries):
+        # One call per query, still concurrent and bounded by _search_semaphore()
+        return await run_searches(queries, task_ids, original_question, bool(follow_up_queries))
+
+    ns, timestamp = _clock()
+    search_results = []
+    sources_gathered = []
+    for query, task_id, item in zip(queries, task_ids, batch.results):
+        urls = list(dict.fromkeys(chain(item.sources, extract_urls_from_text(item.summary))))
+        search_results.append(SearchResult(
+            id=f"search-{ns}-{task_id}",
+            query=query,
+            summary=item.summary,
+            sources=tuple(urls),
+            task_id=task_id,
+            relevance_score=0.9,
+            timestamp=timestamp
+        ))
+        sources_gathered.extend(urls)
 
-        return {
-            "search_results": flattened_results,
-            "sources_gathered": list(all_sources),
-            "total_queries_run": total_queries_run,
-            "current_phase": "reflection"
-        }
+    logger.debug("Batched web search completed, found %d source URLs", len(sources_gathered))
 
-    except Exception as e:
-        print(f"[ERROR] Aggregation failed: {str(e)}")
-        return {
-            "errors": [f"Aggregation failed: {str(e)}"],
-            "current_phase": "reflection"
-        }
+    return {
+        "search_results": search_results,
+        "sources_gathered": sources_gathered
+    }
 
 
 async def reflection_node(state: OverallState) -> Dict[str, Any]:
     """
-    Phase 4: Analyse search results and determine if more research is needed
+    Phase 3: Aggregate the search results and determine if more research is needed
     """
     try:
-        search_results = state.get("search_results", [])
+        raw_results = state.get("search_results", [])
         original_question = state.get("original_question", "")
         research_loop_count = state.get("research_loop_count", 0)
 
-        print(f"[DEBUG] Reflecting on {len(search_results)} search results")
-
-        results_text = format_search_results_for_reflection(search_results)
-        source_count = len(state.get("sources_gathered", []))
-
-        llm = get_llm(config.reflection_model)
-        prompt = f"{REFLECTION_SYSTEM_PROMPT}\n\n{REFLECTION_USER_TEMPLATE.format(question=original_question, research_summary=results_text, source_count=source_count, loop_count=research_loop_count)}"
+        # The workflow answers after this loop regardless (last allowed loop), and with
+        # no results there is nothing to reflect on, so skip the LLM call
+        answer_now = research_loop_count >= config.max_research_loops - 1 or not raw_results
+
+        # sources_gathered is always a flat list of URL strings (see web_search_node)
+        source_count = len(set(state.get("sources_gathered", ())))
+
+        # One pass over the results: flatten nested lists, total the summary length
+        # and build the reflection prompt blocks
+        search_results: List[SearchResult] = []
+        blocks: List[str] = []
+        summary_chars = 0
+        for item in raw_results:
+            for result in item if isinstance(item, list) else (item,):
+                search_results.append(result)
+                summary_chars += len(result.summary)
+                if not answer_now:
+                    blocks.append(format_reflection_entry(len(search_results), result))
+        # search_results accumulates across loops, so this counts every search run so far
+        total_queries_run = len(search_results)
+
+        # Once a follow-up loop has run, plenty of sources and findings is
+        # obviously enough; answer without another LLM round trip
+        answer_now = answer_now or (
+            research_loop_count >= 1
+            and source_count >= config.min_sources_for_sufficiency
+            and summary_chars >= config.min_summary_chars_for_sufficiency
+        )
 
-        response = await llm.ainvoke([HumanMessage(content=prompt)])
+        if answer_now:
+            logger.debug("Skipping reflection at loop %d with %d results", research_loop_count, total_queries_run)
+            return {
+                "is_sufficient": True,
+                "knowledge_gap": "",
+                "follow_up_queries": [],
+                "total_queries_run": total_queries_run,
+                "research_loop_count": research_loop_count + 1,
+                "current_phase": Phase.GENERATING_ANSWER
+            }
+
+        logger.debug("Reflecting on %d search results from %d sources", total_queries_run, source_count)
+
+        results_text = truncate_findings("\n".join(blocks), config.max_prompt_findings_chars)
+
+        llm = get_llm(config.reflection_model, schema=Reflection)
+        messages = _build_messages(
+            REFLECTION_SYSTEM_PROMPT, REFLECTION_USER_TEMPLATE,
+            question=original_question, research_summary=results_text,
+            source_count=source_count, loop_count=research_loop_count
+        )
 
         try:
-            raw = _content_to_str(response.content)
-            # Strip markdown code fences
-            if '```' in raw:
-                raw = re.sub(r'```(?:json)?\s*', '', raw).strip()
-            # Extract JSON
-            if '{' in raw and '}' in raw:
-                start = raw.find('{')
-                end = raw.rfind('}')
-                json_text = raw[start:end + 1] if start < end else raw
-            else:
-                # Wrap bare key:value content
-                json_text = '{' + raw.strip() + '}'
-            parsed = json.loads(json_text)
-
-            is_sufficient = parsed.get("is_sufficient", True)
-            knowledge_gap = parsed.get("knowledge_gaps", parsed.get("knowledge_gap", ""))
-            follow_up_queries = parsed.get("follow_up_queries", [])
-
-        except (json.JSONDecodeError, AttributeError, TypeError) as e:
-            print(f"[DEBUG] JSON parsing failed in reflection: {e}")
+            reflection = await _invoke_with_retry(llm, messages)
+        except OutputParserException as e:
+            logger.debug("Structured output parsing failed in reflection: %s", e)
+            reflection = None
+
+        if reflection is not None:
+            is_sufficient = reflection.is_sufficient
+            knowledge_gap = reflection.knowledge_gaps
+            follow_up_queries = reflection.follow_up_queries
+        else:
             is_sufficient = True
             knowledge_gap = ""
             follow_up_queries = []
@@ -308,57 +590,100 @@ async def reflection_node(state: OverallState) -> Dict[str, Any]:
             and len(follow_up_queries) > 0
         )
 
-        print(f"[DEBUG] Reflection complete — sufficient: {is_sufficient}, will continue: {should_continue}")
+        logger.debug("Reflection complete — sufficient: %s, will continue: %s", is_sufficient, should_continue)
 
         return {
             "is_sufficient": is_sufficient,
             "knowledge_gap": knowledge_gap,
             "follow_up_queries": follow_up_queries,
+            "total_queries_run": total_queries_run,
             "research_loop_count": research_loop_count + 1,
-            "current_phase": "generating_answer" if is_sufficient else "search_web"
+            "current_phase": Phase.GENERATING_ANSWER if is_sufficient else Phase.SEARCH_WEB
         }
 
     except Exception as e:
-        print(f"[ERROR] Reflection failed: {str(e)}")
+        logger.error("Reflection failed: %s", e)
         return {
             "is_sufficient": True,
             "knowledge_gap": f"Reflection error: {str(e)}",
             "follow_up_queries": [],
             "research_loop_count": state.get("research_loop_count", 0) + 1,
-            "current_phase": "generating_answer",
+            "current_phase": Phase.GENERATING_ANSWER,
             "errors": [f"Reflection failed: {str(e)}"]
         }
 
 
+async def _select_answer_results(question: str, search_results: List[SearchResult]) -> List[SearchResult]:
+    """
+    Keep the config.answer_top_k results whose summaries are most similar to the
+    question, in their original order. Runs with no more results than that skip
+    the embedding call; if embedding fails, every result is used.
+    """
+    top_k = config.answer_top_k
+    if top_k <= 0 or len(search_results) <= top_k:
+        return search_results
+
+    try:
+        embeddings = _embeddings_client()
+        question_vector, summary_vectors = await asyncio.gather(
+            embeddings.aembed_query(question, task_type="RETRIEVAL_QUERY"),
+            embeddings.aembed_documents([r.summary for r in search_results], task_type="RETRIEVAL_DOCUMENT"),
+        )
+    except Exception as e:
+        logger.warning("Embedding search results failed, answering from all of them: %s", e)
+        return search_results
+
+    summaries = np.asarray(summary_vectors, dtype=np.float32)
+    summaries /= np.linalg.norm(summaries, axis=1, keepdims=True).clip(min=1e-12)
+    similarities = summaries @ np.asarray(question_vector, dtype=np.float32)
+    top = np.sort(np.argpartition(-similarities, top_k - 1)[:top_k])
+    logger.debug("Answering from the top %d of %d search results", top_k, len(search_results))
+    return [search_results[i] for i in top]
+
+
 async def answer_generation_node(state: OverallState) -> Dict[str, Any]:
     """
-    Phase 5: Generate comprehensive final answer with citations
+    Phase 4: Generate comprehensive final answer with citations
     """
     try:
         search_results = state.get("search_results", [])
         original_question = state.get("original_question", "")
         sources_gathered = state.get("sources_gathered", [])
 
-        print(f"[DEBUG] Generating final answer from {len(search_results)} results")
+        logger.debug("Generating final answer from %d results", len(search_results))
 
-        formatted_results = format_search_results_for_answer(search_results)
+        answer_results = await _select_answer_results(original_question, search_results)
+        formatted_results = truncate_findings(
+            format_search_results_for_answer(answer_results), config.max_prompt_findings_chars
+        )
         sources_list = format_sources_list(sources_gathered)
 
+        # Collect unique citations from all search results up front, so the node
+        # returns as soon as the last answer token arrives
+        unique_urls = dict.fromkeys(chain.from_iterable(result.sources for result in search_results))
+        unique_urls.pop("", None)
+        citations = list(unique_urls)
+
         llm = get_llm(config.answer_model)
-        prompt = f"{ANSWER_GENERATION_SYSTEM_PROMPT}\n\n{ANSWER_GENERATION_USER_TEMPLATE.format(question=original_question, research_findings=formatted_results, sources=sources_list)}"
+        messages = _build_messages(
+            ANSWER_GENERATION_SYSTEM_PROMPT, ANSWER_GENERATION_USER_TEMPLATE,
+            question=original_question, research_findings=formatted_results, sources=sources_list
+        )
 
-        response = await llm.ainvoke([HumanMessage(content=prompt)])
-        final_answer = _content_to_str(response.content)
+        # Stream the answer so callers see tokens as soon as they arrive
+        progress_callback = _get_progress_callback()
 
-        # Collect unique citations from all search results
-        citations = []
-        seen: set = set()
-        for result in search_results:
-            if isinstance(result, dict):
-                for url in result.get("citations", []) + result.get("sources", []):
-                    if url and url not in seen:
-                        citations.append(url)
-                        seen.add(url)
+        async def forward_delta(delta: str) -> None:
+            await progress_callback({
+                "phase": Phase.GENERATING_ANSWER,
+                "status": "in_progress",
+                "delta": delta
+            })
+
+        response = await _stream_with_retry(
+            llm, messages, forward_delta if progress_callback is not None else None
+        )
+        final_answer = _content_to_str(response.content)
 
         research_summary = {
             "total_queries": len(state.get("query_list", [])),
@@ -368,18 +693,22 @@ async def answer_generation_node(state: OverallState) -> Dict[str, Any]:
             "completion_time": datetime.now().isoformat()
         }
 
-        print(f"[DEBUG] Generated final answer with {len(citations)} citations")
+        logger.debug("Generated final answer with %d citations", len(citations))
 
         return {
             "final_answer": final_answer,
             "citations": citations,
             "research_summary": research_summary,
             "current_phase": "completed",
-            "messages": [HumanMessage(content=original_question), response]
+            # Reuse the question message already in state rather than building a copy
+            "messages": [
+                state["messages"][0] if state.get("messages") else HumanMessage(content=original_question),
+                response
+            ]
         }
 
     except Exception as e:
-        print(f"[ERROR] Answer generation failed: {str(e)}")
+        logger.error("Answer generation failed: %s", e)
         return {
             "final_answer": f"I apologise, but I encountered an error while generating the final answer: {str(e)}",
             "citations": [],
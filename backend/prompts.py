@@ -1,4 +1,5 @@
-from typing import List
+from functools import lru_cache
+from typing import List, Tuple
 from backend.state import SearchResult
 
 # Query Generation Prompts
@@ -14,11 +15,7 @@ Guidelines:
 5. Include relevant time periods, specific entities, or technical terms when appropriate
 6. Consider both primary sources and comparative analysis when needed
 
-Format your response as JSON:
-{
-  "rationale": "Brief explanation of your research strategy",
-  "queries": ["query1", "query2", "query3"]
-}"""
+Return a brief rationale for your research strategy and the list of queries."""
 
 QUERY_GENERATION_USER_TEMPLATE = """Please generate targeted search queries for this question:
 
@@ -26,6 +23,37 @@ Question: {question}
 
 Focus on creating queries that will help gather authoritative, comprehensive information to provide a well-researched answer."""
 
+# Web Search Prompts
+# System prompts are sent as a separate, byte-identical first message and the
+# variable parts go last, so the provider's prompt-prefix cache can reuse them
+WEB_SEARCH_SYSTEM_PROMPT = """You are a research assistant with access to comprehensive knowledge up to your training cutoff.
+Search for and synthesise information about the user's query.
+
+Please provide:
+1. A comprehensive summary of key findings (2-3 paragraphs)
+2. Specific facts, statistics, and data points
+3. Different perspectives or approaches where relevant
+4. Recent developments or trends if applicable
+5. Reliable source URLs you are referencing (cite specific websites, papers, or articles)
+
+Be thorough, accurate, and cite specific sources where possible."""
+
+WEB_SEARCH_USER_TEMPLATE = """Search for and synthesise information about: {query}"""
+
+WEB_SEARCH_BATCH_SYSTEM_PROMPT = """You are a research assistant with access to comprehensive knowledge up to your training cutoff.
+Search for and synthesise information about EACH of the queries the user lists.
+
+For each query, provide:
+1. A comprehensive summary of key findings (2-3 paragraphs) with specific facts, statistics, and data points
+2. Different perspectives, recent developments or trends where relevant
+3. Reliable source URLs you are referencing (cite specific websites, papers, or articles)
+
+Return one result per query, in the order given, repeating each query exactly."""
+
+WEB_SEARCH_BATCH_USER_TEMPLATE = """Search for and synthesise information about each of these queries:
+
+{queries}"""
+
 # Web Search Analysis Prompts  
 WEB_SEARCH_ANALYSIS_PROMPT = """You are analyzing web search results to extract key information relevant to a research question.
 
@@ -68,14 +96,7 @@ Research Findings:
 Sources Gathered: {source_count}
 Research Loops Completed: {loop_count}
 
-Evaluate if this information is sufficient to provide a comprehensive answer. Format your response as JSON:
-
-{
-  "is_sufficient": true/false,
-  "analysis": "Your evaluation of the research completeness",
-  "knowledge_gaps": "Specific gaps identified (if any)",
-  "follow_up_queries": ["additional query 1", "additional query 2"] // Only if is_sufficient is false
-}"""
+Evaluate if this information is sufficient to provide a comprehensive answer. Report any knowledge gaps, and give follow-up queries only if it is not sufficient."""
 
 # Answer Generation Prompts
 ANSWER_GENERATION_SYSTEM_PROMPT = """You are an expert research analyst tasked with synthesizing comprehensive, well-sourced answers from research findings.
@@ -106,33 +127,40 @@ Sources:
 
 Please synthesize this information into a comprehensive, well-structured answer that directly addresses the user's question. Use markdown formatting and include proper citations."""
 
+def format_reflection_entry(index: int, result: SearchResult) -> str:
+    """Format one numbered search result for reflection analysis"""
+    key_url = result.sources[0] if result.sources else 'No sources'
+    return f"""
+Research Area {index}: {result.query}
+Summary: {result.summary}
+Sources: {len(result.sources)} sources
+Key URL: {key_url}
+"""
+
 def format_search_results_for_reflection(search_results: List[SearchResult]) -> str:
     """Format search results for reflection analysis"""
-    formatted = []
-    
-    for i, result in enumerate(search_results, 1):
-        formatted.append(f"""
-Research Area {i}: {result['query']}
-Summary: {result['summary']}
-Sources: {len(result['sources'])} sources
-Key URL: {result['sources'][0] if result['sources'] else 'No sources'}
-""")
-    
-    return "\n".join(formatted)
+    return "\n".join(format_reflection_entry(i, result) for i, result in enumerate(search_results, 1))
+
+def truncate_findings(text: str, max_chars: int) -> str:
+    """Cut findings to at most max_chars, at the last line break inside the budget"""
+    if len(text) <= max_chars:
+        return text
+    cut = text.rfind("\n", 0, max_chars)
+    return text[:cut if cut > 0 else max_chars]
 
 def format_search_results_for_answer(search_results: List[SearchResult]) -> str:
     """Format search results for final answer generation"""
-    formatted = []
-    
-    for result in search_results:
-        formatted.append(f"""
-Query: {result['query']}
-Findings: {result['summary']}
-""")
-    
-    return "\n".join(formatted)
+    return "\n".join(f"""
+Query: {result.query}
+Findings: {result.summary}
+""" for result in search_results)
+
+@lru_cache(maxsize=32)
+def _sources_block(sources: Tuple[str, ...]) -> str:
+    """Bulleted first 20 unique sources, in first-seen order so the prompt text is stable"""
+    unique_sources = list(dict.fromkeys(sources))
+    return "\n".join([f"- {source}" for source in unique_sources[:20]])  # Limit to top 20 sources
 
 def format_sources_list(sources: List[str]) -> str:
     """Format sources list for citations"""
-    unique_sources = list(set(sources))
-    return "\n".join([f"- {source}" for source in unique_sources[:20]])  # Limit to top 20 sources
\ No newline at end of file
+    return _sources_block(tuple(sources))
\ No newline at end of file
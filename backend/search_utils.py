@@ -2,37 +2,59 @@
 Utility functions for handling search results and citations from Gemini API.
 """
 import re
+import sys
+from functools import lru_cache
 from typing import Dict, List, Any, Optional
 from datetime import datetime
+from urllib.parse import urlsplit
 
-def resolve_urls(grounding_chunks: List[Dict[str, Any]], task_id: str) -> List[Dict[str, Any]]:
+def resolve_urls(
+    grounding_chunks: List[Dict[str, Any]], task_id: str, dedup_by_domain: bool = True
+) -> List[Dict[str, Any]]:
     """
     Convert long URLs from grounding chunks to shorter versions for token efficiency.
     
     Args:
         grounding_chunks: List of grounding chunks from Gemini API response
         task_id: Task identifier for the current search
+        dedup_by_domain: Also drop chunks repeating the title and domain of an earlier
+            one, such as query-string variants of the same page
         
     Returns:
-        List of dictionaries with original and shortened URLs
+        List of dictionaries with original and shortened URLs, one per unique URL
     """
     resolved_urls = []
     
     if not grounding_chunks:
         return resolved_urls
         
+    # Chunks often repeat a source; keep its first occurrence so each URL gets one citation
+    seen = set()
+    seen_signatures = set()
+    # All URLs from one response share its resolution time
+    timestamp = datetime.now().isoformat()
+    
     # Process each grounding chunk
-    for i, chunk in enumerate(grounding_chunks):
+    for chunk in grounding_chunks:
         if not chunk.get('web_search'):
             continue
             
         # Extract URL from the chunk
         url = chunk.get('web_search', {}).get('url', '')
-        if not url:
+        if not url or url in seen:
             continue
+        seen.add(url)
+        title = chunk['web_search'].get('title')
+        if dedup_by_domain and title:
+            signature = (title, urlsplit(url).netloc)
+            if signature in seen_signatures:
+                continue
+            seen_signatures.add(signature)
             
-        # Create a short identifier for the URL
-        short_url = f"[{task_id}-{i+1}]"
+        # Create a short identifier for the URL, numbered by unique source
+        n = len(resolved_urls) + 1
+        # Interned: the same marker object is reused by citations and marker lookups
+        short_url = sys.intern(f"[{task_id}-{n}]")
         
         # Add to resolved URLs list
         resolved_urls.append({
@@ -41,23 +63,52 @@ def resolve_urls(grounding_chunks: List[Dict[str, Any]], task_id: str) -> List[D
             "title": chunk.get('web_search', {}).get('title', 'Unknown Source'),
             "snippet": chunk.get('web_search', {}).get('snippet', ''),
             "value": url,
-            "id": f"{task_id}-{i+1}",
-            "timestamp": datetime.now().isoformat()
+            "id": f"{task_id}-{n}",
+            "timestamp": timestamp
         })
         
     return resolved_urls
 
+# Basic URL regex pattern, compiled once for every search result. Host labels, the dots
+# between them and the path use disjoint character classes, so there is only one way to
+# split a match and a failed scan backtracks at most once over each piece
+_URL_RE = re.compile(
+    r"https?://[A-Za-z0-9-]+(?:\.[A-Za-z0-9-]+)+(?:/[A-Za-z0-9\-._~%!$&'()*+,;=:@/?#\[\]]*)?",
+    re.ASCII,
+)
+
+# Bracketed tokens, which include any citation markers already in the text
+_MARKER_RE = re.compile(r'\[[^\]]+\]')
+
+# Paragraph separator in model answers
+_PARAGRAPH_BREAK_RE = re.compile(r'\n\n')
+
+# Word tokens for matching citation snippets to paragraphs
+_WORD_RE = re.compile(r'\b\w+\b')
+
+def _trim_url(url: str) -> str:
+    """Drop sentence punctuation (and an unmatched closing paren) caught at the end of a URL"""
+    url = url.rstrip(".,;:!?'")
+    if url.endswith(")") and url.count("(") < url.count(")"):
+        url = url[:-1].rstrip(".,;:!?'")
+    return url
+
+@lru_cache(maxsize=128)
+def _extract_urls(text: str) -> tuple:
+    # Unique URLs in order of first appearance; a tuple so cached results stay immutable
+    return tuple(dict.fromkeys(_trim_url(m.group(0)) for m in _URL_RE.finditer(text)))
+
 def extract_urls_from_text(text):
-    """Extract URLs from text response when grounding metadata isn't available"""
-    # Basic URL regex pattern
-    url_pattern = r'https?://[\w\d\-\.]+\.[a-zA-Z]{2,}(?:/[\w\d\-\._~:/?#[\]@!$&\'()*+,;=]*)'
-    
-    # Find all URLs in the text
-    import re
-    urls = re.findall(url_pattern, text)
-    
-    # Return unique URLs
-    return list(set(urls))
+    """
+    Extract URLs from text response when grounding metadata isn't available.
+    Results are memoized by text (semantic cache hits replay identical summaries);
+    each call returns a fresh list.
+    """
+    # Every match starts with "http"; a C-level substring check skips the regex scan
+    # for the many responses that cite no URLs at all
+    if "http" not in text:
+        return []
+    return list(_extract_urls(text))
 
 def get_citations(response: Any, resolved_urls: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
     """
@@ -70,14 +121,9 @@ def get_citations(response: Any, resolved_urls: List[Dict[str, Any]]) -> List[Di
     Returns:
         List of citation dictionaries
     """
-    if not resolved_urls:
-        return []
-        
-    citations = []
-    
     # Create citation objects
-    for url_data in resolved_urls:
-        citation = {
+    return [
+        {
             "citation": url_data["id"],
             "short_url": url_data["short_url"],
             "url": url_data["orig_url"],
@@ -85,9 +131,24 @@ def get_citations(response: Any, resolved_urls: List[Dict[str, Any]]) -> List[Di
             "text_segments": [],
             "segments": [url_data]
         }
-        citations.append(citation)
-        
-    return citations
+        for url_data in resolved_urls
+    ]
+
+@lru_cache(maxsize=1024)
+def _snippet_words(snippet: str) -> frozenset:
+    """Word set of a grounding snippet; the same snippets recur across answers"""
+    return frozenset(_WORD_RE.findall(snippet.lower()))
+
+def _overlap_exceeds(a: frozenset, b: frozenset, k: int) -> bool:
+    """Whether a and b share more than k elements; probes the larger set and stops at k + 1 hits"""
+    small, large = (a, b) if len(a) <= len(b) else (b, a)
+    hits = 0
+    for word in small:
+        if word in large:
+            hits += 1
+            if hits > k:
+                return True
+    return False
 
 def insert_citation_markers(text: str, citations: List[Dict[str, Any]]) -> str:
     """
@@ -100,34 +161,63 @@ def insert_citation_markers(text: str, citations: List[Dict[str, Any]]) -> str:
     Returns:
         Text with citation markers inserted
     """
-    modified_text = text
+    # Citations whose marker the model did not already emit; usually none. One scan
+    # collects the markers present instead of a substring search per citation
+    present = set(_MARKER_RE.findall(text))
+    missing = [citation for citation in citations if citation["short_url"] not in present]
+    if not missing:
+        return text
+    
+    # Locate and tokenize the paragraphs once without copying them out; markers only
+    # append a short token, so each paragraph's word set stays valid as citations are added
+    para_ends = [m.start() for m in _PARAGRAPH_BREAK_RE.finditer(text)]
+    para_ends.append(len(text))
+    para_starts = [0] + [end + 2 for end in para_ends[:-1]]
+    para_word_sets = [
+        frozenset(word.lower() for word in _WORD_RE.findall(text, start, end))
+        for start, end in zip(para_starts, para_ends)
+    ]
+    # Markers to append, by paragraph index
+    added: Dict[int, List[str]] = {}
+    inserted = set()
     
-    # For each citation, ensure its marker is in the text
-    for citation in citations:
+    # For each missing citation, ensure its marker is in the text
+    for citation in missing:
         short_url = citation["short_url"]
         
-        # Skip if the marker is already present
-        if short_url in modified_text:
+        # Skip if an earlier citation with the same marker was placed
+        if short_url in inserted:
             continue
             
         # If not present, add it at the end of a relevant paragraph
-        relevant_snippets = [seg.get("snippet", "") for seg in citation.get("segments", [])]
-        for snippet in relevant_snippets:
-            if snippet and len(snippet) > 20:
-                # Find a paragraph that contains part of the snippet
-                snippet_words = set(re.findall(r'\b\w+\b', snippet.lower()))
-                paragraphs = modified_text.split('\n\n')
-                
-                for i, para in enumerate(paragraphs):
-                    para_words = set(re.findall(r'\b\w+\b', para.lower()))
-                    # Check for word overlap
-                    if len(para_words & snippet_words) > 3 and not short_url in para:
-                        # Add citation to the end of this paragraph
-                        paragraphs[i] = para + f" {short_url}"
-                        modified_text = '\n\n'.join(paragraphs)
-                        break
+        snippet_sets = [
+            _snippet_words(snippet)
+            for snippet in (seg.get("snippet", "") for seg in citation.get("segments", []))
+            if snippet and len(snippet) > 20
+        ]
+        for snippet_words in snippet_sets:
+            # Find a paragraph that contains part of the snippet
+            for i, para_words in enumerate(para_word_sets):
+                # Check for word overlap
+                if _overlap_exceeds(para_words, snippet_words, 3) and short_url not in added.get(i, ()):
+                    # Add citation to the end of this paragraph
+                    added.setdefault(i, []).append(short_url)
+                    inserted.add(short_url)
+                    break
+    
+    if not added:
+        return text
     
-    return modified_text
+    # Copy the text once, splicing the markers in after their paragraphs
+    pieces = []
+    position = 0
+    for i in sorted(added):
+        end = para_ends[i]
+        pieces.append(text[position:end])
+        pieces.extend(f" {short_url}" for short_url in added[i])
+        position = end
+    pieces.append(text[position:])
+    return "".join(pieces)
 
 def format_citations_for_display(citations: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
     """
@@ -139,13 +229,10 @@ def format_citations_for_display(citations: List[Dict[str, Any]]) -> List[Dict[s
     Returns:
         List of formatted citation dictionaries for display
     """
-    formatted_citations = []
-    
-    for citation in citations:
-        formatted_citation = {
+    return [
+        {
             "title": citation.get("title", "Unknown Source"),
             "url": citation.get("url", "")
         }
-        formatted_citations.append(formatted_citation)
-        
-    return formatted_citations
+        for citation in citations
+    ]
@@ -12,47 +12,24 @@ from pathlib import Path
 # Add parent directory to path for imports
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
-def create_manual_visualization():
-    """Create visualization based on the workflow structure we know"""
-    
-    print("🔍 DEEP RESEARCH AGENT - WORKFLOW VISUALIZATION")
-    print("=" * 60)
-    
-    # Manual graph structure based on your workflow
-    nodes = {
-        "generate_queries": "📝 Generate targeted search queries",
-        "web_search": "🔍 Execute parallel web searches", 
-        "aggregate_results": "📊 Combine search results",
-        "reflection": "🤔 Analyze completeness & decide next steps",
-        "answer_generation": "📋 Synthesize final answer with citations"
-    }
-    
-    edges = [
-        ("__start__", "generate_queries"),
-        ("generate_queries", "web_search"),
-        ("web_search", "aggregate_results"), 
-        ("aggregate_results", "reflection"),
-        ("reflection", "answer_generation"),
-        ("reflection", "generate_queries"),  # Loop back for more research
-        ("answer_generation", "__end__")
-    ]
-    
-    print(f"\n📊 Graph Statistics:")
-    print(f"   • Nodes: {len(nodes)}")
-    print(f"   • Edges: {len(edges)}")
-    
-    print(f"\n📍 NODES:")
-    for node_id, description in nodes.items():
-        print(f"   • {node_id}: {description}")
-    
-    print(f"\n🔗 EDGES:")
-    for source, target in edges:
-        print(f"   • {source} → {target}")
-    
-    # ASCII Representation
-    print(f"\n📋 ASCII GRAPH REPRESENTATION:")
-    print("-" * 50)
-    ascii_graph = """
+# Manual graph structure of the research workflow
+NODES = {
+    "generate_queries": "📝 Generate targeted search queries",
+    "web_search": "🔍 Execute parallel web searches", 
+    "reflection": "🤔 Aggregate results, analyze completeness & decide next steps",
+    "answer_generation": "📋 Synthesize final answer with citations"
+}
+
+EDGES = (
+    ("__start__", "generate_queries"),
+    ("generate_queries", "web_search"),
+    ("web_search", "reflection"),
+    ("reflection", "answer_generation"),
+    ("reflection", "generate_queries"),  # Loop back for more research
+    ("answer_generation", "__end__")
+)
+
+ASCII_GRAPH = """
     ┌─────────────┐
     │   START     │
     └──────┬──────┘
@@ -71,12 +48,6 @@ def create_manual_visualization():
            │
            ▼
     ┌─────────────┐
-    │aggregate_   │
-    │results      │
-    └──────┬──────┘
-           │
-           ▼
-    ┌─────────────┐
     │reflection   │◄─────┐
     └──────┬──────┘      │
            │             │
@@ -98,27 +69,21 @@ def create_manual_visualization():
 ┌─────────────┐  │       │
 │    END      │  └───────┘
 └─────────────┘
-    """
-    print(ascii_graph)
-    
-    # Mermaid Diagram
-    print(f"\n🎨 MERMAID DIAGRAM SOURCE:")
-    print("-" * 50)
-    mermaid_code = """
+"""
+
+MERMAID_CODE = """
 %%{init: {'flowchart': {'curve': 'linear'}}}%%
 graph TD;
     START([__start__]):::first
     GQ[generate_queries<br/>📝 Generate Search Queries]
     WS[web_search<br/>🔍 Web Search<br/>Parallel Execution]
-    AR[aggregate_results<br/>📊 Aggregate Results]
     RF[reflection<br/>🤔 Reflect on Results]
     AG[answer_generation<br/>📋 Generate Answer]
     END([__end__]):::last
 
     START --> GQ
     GQ --> WS
-    WS --> AR
-    AR --> RF
+    WS --> RF
     RF -->|sufficient| AG
     RF -->|need more| GQ
     AG --> END
@@ -126,46 +91,26 @@ graph TD;
     classDef default fill:#f2f0ff,line-height:1.2
     classDef first fill-opacity:0
     classDef last fill:#bfb6fc
-"""
-    print(mermaid_code.strip())
-    print(f"\n💡 Copy the above code to https://mermaid.live to view the diagram")
-    
-    # State Schema
-    print(f"\n📋 STATE SCHEMA ANALYSIS:")
-    print("-" * 50)
-    state_fields = [
-        "messages: List[BaseMessage] - LangChain message history",
-        "original_question: str - User's research question", 
-        "query_list: List[str] - Generated search queries",
-        "search_results: List[SearchResult] - Parallel search outputs",
-        "sources_gathered: List[str] - Discovered URLs",
-        "is_sufficient: bool - Research completeness decision",
-        "follow_up_queries: List[str] - Additional queries if needed",
-        "research_loop_count: int - Current iteration number",
-        "final_answer: str - Synthesized response",
-        "citations: List[str] - Source references",
-        "research_summary: Dict[str, Any] - Metadata and statistics",
-        "current_phase: str - Current processing phase",
-        "errors: List[str] - Any errors encountered"
-    ]
-    
-    print(f"\n🏗️  OverallState Structure:")
-    for field in state_fields:
-        print(f"   • {field}")
-    
-    # Save Mermaid to file
-    try:
-        output_dir = Path("visualizations")
-        output_dir.mkdir(exist_ok=True)
-        
-        mermaid_file = output_dir / "research_workflow.mmd"
-        with open(mermaid_file, "w") as f:
-            f.write(mermaid_code.strip())
-        
-        print(f"\n✅ Mermaid diagram saved to: {mermaid_file.absolute()}")
-        
-        # Create simple HTML
-        html_content = f"""
+""".strip()
+
+STATE_FIELDS = (
+    "messages: List[BaseMessage] - LangChain message history",
+    "original_question: str - User's research question", 
+    "query_list: List[str] - Generated search queries",
+    "search_results: List[SearchResult] - Parallel search outputs",
+    "sources_gathered: List[str] - Discovered URLs",
+    "is_sufficient: bool - Research completeness decision",
+    "follow_up_queries: List[str] - Additional queries if needed",
+    "research_loop_count: int - Current iteration number",
+    "final_answer: str - Synthesized response",
+    "citations: List[str] - Source references",
+    "research_summary: Dict[str, Any] - Metadata and statistics",
+    "current_phase: str - Current processing phase",
+    "errors: List[str] - Any errors encountered"
+)
+
+# Standalone page for the Mermaid diagram; literal braces are doubled for str.format
+HTML_TEMPLATE = """
 <!DOCTYPE html>
 <html>
 <head>
@@ -194,7 +139,7 @@ graph TD;
         </div>
         
         <div class="mermaid">
-{mermaid_code.strip()}
+{mermaid_code}
         </div>
         
         <div class="info">
@@ -212,10 +157,57 @@ graph TD;
 </body>
 </html>
 """
+
+
+def create_manual_visualization():
+    """Create visualization based on the workflow structure we know"""
+    
+    print("🔍 DEEP RESEARCH AGENT - WORKFLOW VISUALIZATION")
+    print("=" * 60)
+    
+    print(f"\n📊 Graph Statistics:")
+    print(f"   • Nodes: {len(NODES)}")
+    print(f"   • Edges: {len(EDGES)}")
+    
+    print(f"\n📍 NODES:")
+    for node_id, description in NODES.items():
+        print(f"   • {node_id}: {description}")
+    
+    print(f"\n🔗 EDGES:")
+    for source, target in EDGES:
+        print(f"   • {source} → {target}")
+    
+    # ASCII Representation
+    print(f"\n📋 ASCII GRAPH REPRESENTATION:")
+    print("-" * 50)
+    print(ASCII_GRAPH)
+    
+    # Mermaid Diagram
+    print(f"\n🎨 MERMAID DIAGRAM SOURCE:")
+    print("-" * 50)
+    print(MERMAID_CODE)
+    print(f"\n💡 Copy the above code to https://mermaid.live to view the diagram")
+    
+    # State Schema
+    print(f"\n📋 STATE SCHEMA ANALYSIS:")
+    print("-" * 50)
+    
+    print(f"\n🏗️  OverallState Structure:")
+    print("\n".join(f"   • {field}" for field in STATE_FIELDS))
+    
+    # Save Mermaid to file
+    try:
+        output_dir = Path("visualizations")
+        output_dir.mkdir(exist_ok=True)
         
+        mermaid_file = output_dir / "research_workflow.mmd"
+        mermaid_file.write_text(MERMAID_CODE, encoding="utf-8")
+        
+        print(f"\n✅ Mermaid diagram saved to: {mermaid_file.absolute()}")
+        
+        # Create simple HTML
         html_file = output_dir / "research_workflow.html"
-        with open(html_file, "w", encoding="utf-8") as f:
-            f.write(html_content)
+        html_file.write_text(HTML_TEMPLATE.format(mermaid_code=MERMAID_CODE), encoding="utf-8")
         
         print(f"✅ Interactive HTML saved to: {html_file.absolute()}")
         print(f"💡 Open in browser: file://{html_file.absolute()}")
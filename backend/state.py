@@ -1,14 +1,21 @@
-from typing import TypedDict, List, Dict, Any, Optional, Annotated
+from dataclasses import dataclass
+from typing import TypedDict, List, Dict, Any, Optional, Annotated, Tuple
 from operator import add
 from datetime import datetime
 from langchain_core.messages import BaseMessage
+from langgraph.graph.message import add_messages
+from pydantic import BaseModel, Field
 
-class SearchResult(TypedDict):
-    """Search result structure"""
+@dataclass(slots=True, frozen=True)
+class SearchResult:
+    """
+    Search result structure (slotted: no per-instance __dict__; orjson serializes it natively).
+    Sources are a tuple so the frozen result is hashable and can be deduplicated or cached.
+    """
     id: str
     query: str
     summary: str
-    sources: List[str]
+    sources: Tuple[str, ...]
     task_id: str
     relevance_score: float
     timestamp: str
@@ -22,7 +29,7 @@ class TimelineUpdate(TypedDict):
 
 class OverallState(TypedDict):
     """Overall workflow state"""
-    messages: List[Any]
+    messages: Annotated[List[BaseMessage], add_messages]
     original_question: str
     query_list: List[str]
     rationale: str
@@ -65,4 +72,25 @@ class AnswerGenerationState(TypedDict):
     search_results: List[SearchResult]
     original_question: str
     sources_gathered: List[str]
-    research_loop_count: int
\ No newline at end of file
+    research_loop_count: int
+
+class QueryPlan(BaseModel):
+    """Structured output of the query generation LLM call"""
+    rationale: str = Field(description="Brief explanation of the research strategy")
+    queries: List[str] = Field(description="Targeted search queries")
+
+class Reflection(BaseModel):
+    """Structured output of the reflection LLM call"""
+    is_sufficient: bool = Field(description="Whether the research is sufficient to answer the question")
+    knowledge_gaps: str = Field(default="", description="Specific gaps identified, if any")
+    follow_up_queries: List[str] = Field(default_factory=list, description="Additional queries, only if not sufficient")
+
+class QuerySearchSummary(BaseModel):
+    """One query's findings within a batched web search response"""
+    query: str = Field(description="The search query, exactly as given")
+    summary: str = Field(description="Comprehensive summary of key findings for the query")
+    sources: List[str] = Field(default_factory=list, description="Source URLs referenced")
+
+class BatchSearchResults(BaseModel):
+    """Structured output of a batched web search LLM call"""
+    results: List[QuerySearchSummary] = Field(description="Findings for each query, in the order given")
@@ -1,11 +1,64 @@
 import asyncio
+import inspect
+from collections import deque
+from typing import Deque, Dict, List, Optional, Union
+
+import orjson
+
+# Progress messages kept per phase; older ones are dropped
+PHASE_HISTORY_LIMIT = 256
+
+def _progress_update(phase: str, data: dict) -> dict:
+    return {"phase": phase, "status": "in_progress", "progress_message": data.get("message", "")}
+
+def _completion_update(phase: str, data: dict) -> dict:
+    return {"phase": phase, "status": "completed", "details": data}
+
+def _error_update(phase: str, data: dict) -> dict:
+    message = data.get("message", "")
+    return {"phase": phase, "status": "error", "progress_message": message, "details": {"error": message}}
+
+# Timeline envelope builders by update_type; each builds its dict in one literal
+_BUILDERS = {
+    "progress": _progress_update,
+    "completion": _completion_update,
+    "error": _error_update,
+}
+
+def encode_update(timeline_update: Union[dict, List[dict]]) -> bytes:
+    """Serialize a timeline update (or a batch of them) to UTF-8 JSON bytes, stringifying anything non-native"""
+    return orjson.dumps(timeline_update, default=str)
 
 class StreamingWriter:
-    def __init__(self, callback):
-        # callback should be an async function that takes a single timeline_update dict
+    def __init__(
+        self,
+        callback,
+        encoded: bool = False,
+        coalesce_window: float = 0.0,
+        batch_window: float = 0.0,
+        batch_size: int = 32,
+    ):
+        # callback should be an async function that takes a single timeline_update dict,
+        # or its JSON bytes when encoded=True (ready to write straight to an SSE stream)
         self.callback = callback
-        # Track progress messages for phases when no callback is provided
-        self.phase_history = {}
+        self._encoded = encoded
+        # Resolve the dispatch shape once; callables this can't see through (async
+        # __call__, partials, mocks) fall back to awaiting whatever they return
+        self._is_async = asyncio.iscoroutinefunction(callback)
+        # Track recent progress messages for phases when no callback is provided
+        self.phase_history: Dict[str, Deque[str]] = {}
+        self._record_history = callback is None
+        # With a window > 0, progress updates are held for that many seconds and only the
+        # latest one per phase is sent; completion and error updates flush them first
+        self._coalesce_window = coalesce_window if callback else 0.0
+        self._pending: Dict[str, dict] = {}
+        self._flush_task: Optional[asyncio.Task] = None
+        # With a window > 0, updates are buffered and the callback receives a list of them
+        # once the window elapses or batch_size updates are waiting, whichever comes first
+        self._batch_window = batch_window if callback else 0.0
+        self._batch_size = batch_size
+        self._batch: List[dict] = []
+        self._batch_task: Optional[asyncio.Task] = None
 
     async def send_update(self, phase: str, update_type: str, data: dict):
         """
@@ -16,32 +69,82 @@ class StreamingWriter:
         Records progress messages in phase_history when callback is None.
         """
         # Build the timeline update envelope
-        timeline_update = {"phase": phase}
-        if update_type == "progress":
-            timeline_update["status"] = "in_progress"
-            timeline_update["progress_message"] = data.get("message", "")
-            # Record history for progress
-            self.phase_history.setdefault(phase, []).append(data.get("message", ""))
-        elif update_type == "completion":
-            timeline_update["status"] = "completed"
-            timeline_update["details"] = data
-        elif update_type == "error":
-            timeline_update["status"] = "error"
-            timeline_update["progress_message"] = data.get("message", "")
-            timeline_update["details"] = {"error": data.get("message", "")}
-        else:
+        builder = _BUILDERS.get(update_type)
+        if builder is None:
             # Unknown update type; do nothing
             return
+        timeline_update = builder(phase, data)
+        if update_type == "progress":
+            if self._record_history:
+                # Record history for progress
+                history = self.phase_history.get(phase)
+                if history is None:
+                    history = self.phase_history[phase] = deque(maxlen=PHASE_HISTORY_LIMIT)
+                history.append(timeline_update["progress_message"])
+            if self._coalesce_window:
+                self._pending[phase] = timeline_update
+                if self._flush_task is None:
+                    self._flush_task = asyncio.create_task(self._flush_later())
+                return
+        elif self._pending:
+            # Terminal states never overtake the progress they follow
+            await self._drain_pending()
+
+        await self._dispatch(timeline_update)
+
+    async def flush(self) -> None:
+        """Send any updates still held by coalescing or batching"""
+        await self._drain_pending()
+        await self._send_batch()
+
+    async def _drain_pending(self) -> None:
+        task, self._flush_task = self._flush_task, None
+        if task is not None and task is not asyncio.current_task():
+            task.cancel()
+        pending, self._pending = self._pending, {}
+        for timeline_update in pending.values():
+            await self._dispatch(timeline_update)
+
+    async def _flush_later(self) -> None:
+        await asyncio.sleep(self._coalesce_window)
+        await self._drain_pending()
+
+    async def _dispatch(self, timeline_update: dict) -> None:
+        if not self.callback:
+            return
+        if self._batch_window:
+            self._batch.append(timeline_update)
+            if len(self._batch) >= self._batch_size:
+                await self._send_batch()
+            elif self._batch_task is None:
+                self._batch_task = asyncio.create_task(self._send_batch_later())
+            return
+        await self._deliver(encode_update(timeline_update) if self._encoded else timeline_update)
+
+    async def _send_batch(self) -> None:
+        task, self._batch_task = self._batch_task, None
+        if task is not None and task is not asyncio.current_task():
+            task.cancel()
+        batch, self._batch = self._batch, []
+        if batch:
+            await self._deliver(encode_update(batch) if self._encoded else batch)
+
+    async def _send_batch_later(self) -> None:
+        await asyncio.sleep(self._batch_window)
+        await self._send_batch()
 
-        # Forward to callback if provided
-        if self.callback:
-            try:
-                result = self.callback(timeline_update)
-                if asyncio.iscoroutine(result):
+    async def _deliver(self, payload) -> None:
+        # Forward to callback
+        try:
+            if self._is_async:
+                await self.callback(payload)
+            else:
+                result = self.callback(payload)
+                if inspect.isawaitable(result):
                     await result
-            except Exception:
-                # Swallow callback errors
-                pass
+        except Exception:
+            # Swallow callback errors
+            pass
 
 async def stream_progress(phase: str, message: str, writer: StreamingWriter) -> None:
     """Stream a progress update through the writer."""
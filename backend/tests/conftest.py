@@ -1,70 +1,68 @@
 import pytest
-import asyncio
-from unittest.mock import AsyncMock, MagicMock
+from unittest.mock import MagicMock
 import os
+from collections import ChainMap
+from types import MappingProxyType
 
-from streaming import StreamingWriter
+from state import SearchResult
 
 # Set environment variables for testing
 os.environ["DEMO_MODE"] = "true"  # Use demo mode for tests by default
 os.environ["GEMINI_API_KEY"] = "fake-api-key-for-testing"
 
 # Shared fixtures for all tests
-@pytest.fixture
-def mock_writer():
-    """Create a mock StreamingWriter for testing"""
-    # Create a real StreamingWriter instance with a mock callback
-    # This ensures all attributes and methods work as expected
-    callback = AsyncMock()
-    writer = StreamingWriter(callback=callback)
-    
-    # Mock the send_update method to avoid actual async calls
-    writer.send_update = AsyncMock()
-    
-    return writer
-
 @pytest.fixture
 def mock_callback():
     """Create a mock streaming callback"""
     return MagicMock()
 
+# Read-only baseline state; empty sequences are tuples so overlays never share a list
+_BASE_STATE = MappingProxyType({
+    "original_question": "What is the impact of climate change on coral reefs?",
+    "messages": (),
+    "query_list": (),
+    "search_results": (),
+    "sources_gathered": (),
+    "task_id": "test_task_1"
+})
+
 @pytest.fixture
 def basic_state():
     """Create a basic state for testing"""
-    return {
-        "original_question": "What is the impact of climate change on coral reefs?",
-        "messages": [],
-        "query_list": [],
-        "search_results": [],
-        "sources_gathered": [],
-        "task_id": "test_task_1"
-    }
+    return dict(_BASE_STATE)
 
 @pytest.fixture
+def make_state():
+    """Overlay the given keys on the baseline state without copying it (writes land in the overlay)"""
+    return lambda **overrides: ChainMap(overrides, _BASE_STATE)
+
+@pytest.fixture(scope="session")
 def mock_search_results():
-    """Create mock search results for testing"""
-    return [
-        {
-            "query": "climate change effects on coral bleaching",
-            "summary": "Summary 1",
-            "sources": ["https://example.com/1"],
-            "task_id": "test_1",
-            "relevance_score": 0.9,
-            "timestamp": "2025-06-27T10:00:00"
-        },
-        {
-            "query": "rising ocean temperatures impact on coral reefs",
-            "summary": "Summary 2",
-            "sources": ["https://example.com/2"],
-            "task_id": "test_2",
-            "relevance_score": 0.8,
-            "timestamp": "2025-06-27T10:01:00"
-        }
-    ]
+    """Create mock search results for testing (built once; frozen results in a tuple)"""
+    return (
+        SearchResult(
+            id="search-test_1",
+            query="climate change effects on coral bleaching",
+            summary="Summary 1",
+            sources=("https://example.com/1",),
+            task_id="test_1",
+            relevance_score=0.9,
+            timestamp="2025-06-27T10:00:00"
+        ),
+        SearchResult(
+            id="search-test_2",
+            query="rising ocean temperatures impact on coral reefs",
+            summary="Summary 2",
+            sources=("https://example.com/2",),
+            task_id="test_2",
+            relevance_score=0.8,
+            timestamp="2025-06-27T10:01:00"
+        ),
+    )
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 def mock_gemini_response():
-    """Create a mock Gemini API response"""
+    """Create a mock Gemini API response (built once per session; do not mutate)"""
     response = MagicMock()
     response.text = "Test response from Gemini API"
     response.candidates = [MagicMock()]
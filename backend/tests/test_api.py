@@ -1,10 +1,10 @@
 import pytest
-from unittest.mock import patch, AsyncMock
+import asyncio
+from unittest.mock import patch
 from fastapi.testclient import TestClient
 import json
 
 from api import app
-from streaming import StreamingWriter
 
 # Create test client
 client = TestClient(app)
@@ -42,13 +42,13 @@ def test_health_check():
     assert data.get("websocket_enabled") is True
 
 def test_research_endpoint_success(mock_research_result):
-    """Test the research endpoint with successful results via stream_research"""
-    # Fake async generator for stream_research
-    async def fake_stream(question):
-        yield {"type": "complete", "data": mock_research_result}
+    """Test the research endpoint with successful results via run_research"""
+    # Fake non-streaming run returning the final state
+    async def fake_run(question):
+        return mock_research_result
 
-    # Patch the workflow's stream_research method
-    with patch("api.research_workflow.stream_research", new=fake_stream):
+    # Patch the workflow's run_research method
+    with patch("api.research_workflow.run_research", new=fake_run):
         # Make API call (no stream flag needed)
         response = client.post(
             "/research",
@@ -62,6 +62,36 @@ def test_research_endpoint_success(mock_research_result):
         assert data["citations"] == mock_research_result["citations"]
         assert data["research_summary"] == mock_research_result["research_summary"]
 
+def test_admin_reload_requires_token(monkeypatch):
+    """Test that /admin/reload is refused without the admin token and clears the LLM cache with it"""
+    monkeypatch.delenv("ADMIN_TOKEN", raising=False)
+    assert client.post("/admin/reload").status_code == 403
+
+    monkeypatch.setenv("ADMIN_TOKEN", "secret")
+    assert client.post("/admin/reload", headers={"Authorization": "Bearer wrong"}).status_code == 403
+    with patch("api.reset_llm_clients") as mock_reset:
+        response = client.post("/admin/reload", headers={"Authorization": "Bearer secret"})
+    assert response.status_code == 200
+    mock_reset.assert_called_once()
+
+def test_research_batch_endpoint():
+    """Test batch research returns one response per question, in order, isolating failures"""
+    async def fake_run(question):
+        if question == "bad":
+            raise Exception("Research error")
+        return {"final_answer": f"Answer to {question}", "citations": [], "research_summary": {}}
+
+    with patch("api.research_workflow.run_research", new=fake_run):
+        response = client.post("/research/batch", json={"questions": ["one", "bad", "two"]})
+
+    assert response.status_code == 200
+    results = response.json()["results"]
+    assert [r["success"] for r in results] == [True, False, True]
+    assert results[0]["final_answer"] == "Answer to one"
+    assert results[2]["final_answer"] == "Answer to two"
+
+    assert client.post("/research/batch", json={"questions": ["ok", " "]}).status_code == 400
+
 def test_research_endpoint_empty_question():
     """Test the research endpoint with an empty question"""
     response = client.post(
@@ -75,16 +105,13 @@ def test_research_endpoint_empty_question():
     assert "Question cannot be empty" in data.get("error", "")
 
 def test_research_endpoint_error():
-    """Test the research endpoint error handling via stream_research"""
-    # Fake stream_research to raise exception
-    async def fake_stream(question):
-        # Async generator that immediately errors
+    """Test the research endpoint error handling via run_research"""
+    # Fake run_research to raise exception
+    async def fake_run(question):
         raise Exception("Research error")
-        if False:
-            yield None
 
-    # Patch the workflow's stream_research method
-    with patch("api.research_workflow.stream_research", new=fake_stream):
+    # Patch the workflow's run_research method
+    with patch("api.research_workflow.run_research", new=fake_run):
         # Make API call
         response = client.post(
             "/research",
@@ -96,13 +123,20 @@ def test_research_endpoint_error():
         assert data["success"] is False
         assert "Research error" in data.get("error", "")
 
-@pytest.mark.asyncio
 async def test_websocket_connection():
     """Test that the WebSocket route is registered"""
     # The WebSocket endpoint should be available at /research/ws
     routes = [route.path for route in app.routes]
     assert "/research/ws" in routes
 
+def test_websocket_msgpack_encoding():
+    """Test that the WebSocket replies in MessagePack when the client requests it"""
+    ormsgpack = pytest.importorskip("ormsgpack")
+    with client.websocket_connect("/research/ws") as websocket:
+        websocket.send_text(json.dumps({"question": " ", "encoding": "msgpack"}))
+        reply = ormsgpack.unpackb(websocket.receive_bytes())
+    assert reply == {"type": "error", "error": "Question cannot be empty"}
+
 def test_research_stream_events(monkeypatch):
     """Test the SSE streaming endpoint emits node_start events when stream_mode=events"""
     # Fake events generator
@@ -122,3 +156,82 @@ def test_research_stream_events(monkeypatch):
         # Parse payload (strip the 'data: ' prefix)
         payload = json.loads(data_line.replace("data: ", ""))
         assert payload["type"] == "node_start"
+
+def test_research_stream_events_forwards_answer_tokens(monkeypatch):
+    """Test answer-node LLM tokens are streamed as content events, other nodes' tokens are not"""
+    from langchain_core.messages import AIMessageChunk
+
+    async def fake_events(question):
+        yield {"type": "llm_token", "node": "reflection", "data": {"chunk": AIMessageChunk(content="{}")}, "timestamp": 0}
+        yield {"type": "llm_token", "node": "answer_generation", "data": {"chunk": AIMessageChunk(content="Hel")}, "timestamp": 0}
+        yield {"type": "llm_token", "node": "answer_generation", "data": {"chunk": AIMessageChunk(content="lo")}, "timestamp": 0}
+    monkeypatch.setattr("api.research_workflow.stream_research_events", fake_events)
+
+    with client.stream("POST", "/research/stream", json={"question": "Test question", "stream_mode": "events"}) as response:
+        payloads = [json.loads(l[len("data: "):]) for l in response.iter_lines() if l.startswith("data: ")]
+
+    assert [p["content"] for p in payloads if p["type"] == "content"] == ["Hel", "lo"]
+    assert payloads[-1]["type"] == "complete"
+
+async def test_coalesce_batches_frames():
+    """Test that bursts of SSE frames are merged without splitting or losing frames"""
+    from api import _coalesce
+
+    async def frames():
+        for i in range(5):
+            yield f"data: {i}\n\n".encode("utf-8")
+
+    chunks = [chunk async for chunk in _coalesce(frames())]
+    assert len(chunks) < 5
+    assert b"".join(chunks) == b"".join(f"data: {i}\n\n".encode("utf-8") for i in range(5))
+
+async def test_coalesce_bounds_buffer_and_closes_source():
+    """Test that a stalled consumer caps buffered frames and closing it closes the source"""
+    from api import _coalesce
+
+    produced = 0
+    closed = asyncio.Event()
+
+    async def frames():
+        nonlocal produced
+        try:
+            while True:
+                produced += 1
+                yield b"data: x\n\n"
+        finally:
+            closed.set()
+
+    stream = _coalesce(frames(), max_bytes=1, max_pending=4)
+    await stream.__anext__()
+    await asyncio.sleep(0.01)
+    assert produced <= 4 + 3
+    await stream.aclose()
+    assert closed.is_set()
+
+def test_node_complete_output_trims_answer():
+    """Test that node_complete carries an answer preview instead of the full answer"""
+    from api import _node_complete_output
+
+    node_out = {"final_answer": "x" * 500, "citations": ["a"], "current_phase": "completed", "messages": ["m"]}
+    trimmed = _node_complete_output("answer_generation", node_out)
+    assert "final_answer" not in trimmed and "messages" not in trimmed
+    assert trimmed["answer_length"] == 500
+    assert len(trimmed["answer_preview"]) == 200
+    assert trimmed["citations"] == ["a"]
+
+    queries = {"query_list": ["q1", "q2"]}
+    assert _node_complete_output("generate_queries", queries) is queries
+
+def test_state_timeline_update_skips_unchanged_snapshots():
+    """Test that repeated state snapshots with the same phase and counts are not re-reported"""
+    from api import _state_timeline_update
+
+    state = {"current_phase": "search_web", "query_list": ["q1", "q2"], "search_results": [], "research_loop_count": 0}
+    update, key = _state_timeline_update(state, None)
+    assert update["data"]["details"] == {"queries_count": 2, "search_results_count": 0, "research_loop": 0}
+
+    assert _state_timeline_update(dict(state), key) == (None, key)
+
+    state["search_results"] = [{"query": "q1"}]
+    update, _ = _state_timeline_update(state, key)
+    assert update["data"]["details"]["search_results_count"] == 1
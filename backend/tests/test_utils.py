@@ -1,10 +1,14 @@
 import pytest
-from unittest.mock import patch, MagicMock, AsyncMock
-import os
+import asyncio
+from unittest.mock import AsyncMock
+import dataclasses
 
 from config import ResearchAgentConfig
-from streaming import StreamingWriter, stream_progress, stream_completion, stream_error
-from search_utils import extract_urls_from_text
+from streaming import StreamingWriter, stream_progress, stream_completion, stream_error, PHASE_HISTORY_LIMIT
+from search_utils import extract_urls_from_text, insert_citation_markers, resolve_urls
+from prompts import format_search_results_for_answer, format_sources_list, truncate_findings
+from cache import SemanticCache
+import orjson
 
 # Test fixtures
 @pytest.fixture
@@ -12,11 +16,6 @@ def mock_callback():
     """Create a mock streaming callback"""
     return AsyncMock()
 
-@pytest.fixture
-def streaming_writer(mock_callback):
-    """Create a StreamingWriter with mock callback"""
-    return StreamingWriter(callback=mock_callback)
-
 # Tests for configuration
 def test_config_validation_demo_mode():
     """Test config validation when in demo mode"""
@@ -43,61 +42,50 @@ def test_config_validation_without_api_key():
     assert config.validate() is False
 
 # Tests for streaming utilities
-@pytest.mark.asyncio
-async def test_stream_progress(streaming_writer):
-    """Test stream_progress utility function"""
-    await stream_progress(
-        phase="generating_queries", 
-        message="Generating search queries", 
-        writer=streaming_writer
-    )
-    
-    # Verify callback was called with correct data
-    streaming_writer.callback.assert_called_once()
-    timeline_update = streaming_writer.callback.call_args[0][0]
-    assert timeline_update["phase"] == "generating_queries"
-    assert timeline_update["status"] == "in_progress"
-    assert timeline_update["progress_message"] == "Generating search queries"
-
-@pytest.mark.asyncio
-async def test_stream_completion(streaming_writer):
-    """Test stream_completion utility function"""
+async def test_stream_helpers_build_timeline_updates():
+    """Test stream_progress, stream_completion and stream_error, run concurrently on separate writers"""
     completion_data = {
         "queries_generated": 3,
         "time_taken": 2.5
     }
+    # Each writer's async callback records the updates it receives in a plain list
+    sent = {"progress": [], "completion": [], "error": []}
+
+    def capture(kind):
+        async def callback(update):
+            sent[kind].append(update)
+        return callback
+
+    progress_writer, completion_writer, error_writer = (StreamingWriter(callback=capture(kind)) for kind in sent)
     
-    await stream_completion(
-        phase="generating_queries", 
-        details=completion_data,  # Changed from data to details
-        writer=streaming_writer
+    await asyncio.gather(
+        stream_progress(phase="generating_queries", message="Generating search queries", writer=progress_writer),
+        stream_completion(phase="generating_queries", details=completion_data, writer=completion_writer),
+        stream_error(
+            phase="generating_queries",
+            error_message="Error occurred during query generation",
+            writer=error_writer
+        ),
     )
     
-    # Verify callback was called with correct data
-    streaming_writer.callback.assert_called_once()
-    timeline_update = streaming_writer.callback.call_args[0][0]
-    assert timeline_update["phase"] == "generating_queries"
+    # Verify each callback was called once with correct data
+    for updates in sent.values():
+        assert len(updates) == 1
+        assert updates[0]["phase"] == "generating_queries"
+    
+    timeline_update = sent["progress"][0]
+    assert timeline_update["status"] == "in_progress"
+    assert timeline_update["progress_message"] == "Generating search queries"
+    
+    timeline_update = sent["completion"][0]
     assert timeline_update["status"] == "completed"
     assert timeline_update["details"] == completion_data
-
-@pytest.mark.asyncio
-async def test_stream_error(streaming_writer):
-    """Test stream_error utility function"""
-    await stream_error(
-        phase="generating_queries", 
-        error_message="Error occurred during query generation",  # Changed from message to error_message
-        writer=streaming_writer
-    )
     
-    # Verify callback was called with correct data
-    streaming_writer.callback.assert_called_once()
-    timeline_update = streaming_writer.callback.call_args[0][0]
-    assert timeline_update["phase"] == "generating_queries"
+    timeline_update = sent["error"][0]
     assert timeline_update["status"] == "error"
     assert "Error occurred during query generation" in timeline_update["progress_message"]
     assert "Error occurred during query generation" in timeline_update["details"]["error"]
 
-@pytest.mark.asyncio
 async def test_streaming_writer_no_callback():
     """Test StreamingWriter with no callback"""
     writer = StreamingWriter(callback=None)
@@ -111,7 +99,17 @@ async def test_streaming_writer_no_callback():
     assert len(writer.phase_history.get("test_phase", [])) == 1
     assert writer.phase_history["test_phase"][0] == "Test message"
 
-@pytest.mark.asyncio
+async def test_streaming_writer_history_is_bounded():
+    """Test phase history keeps only the most recent progress messages"""
+    writer = StreamingWriter(callback=None)
+
+    for i in range(PHASE_HISTORY_LIMIT + 10):
+        await stream_progress("test_phase", f"Message {i}", writer)
+
+    history = writer.phase_history["test_phase"]
+    assert len(history) == PHASE_HISTORY_LIMIT
+    assert history[-1] == f"Message {PHASE_HISTORY_LIMIT + 9}"
+
 async def test_streaming_writer_exception_handling(mock_callback):
     """Test StreamingWriter exception handling"""
     mock_callback.side_effect = Exception("Connection error")
@@ -123,9 +121,86 @@ async def test_streaming_writer_exception_handling(mock_callback):
     # Verify callback was attempted
     mock_callback.assert_called_once()
     
-    # Check that phase history was still updated despite the error
-    assert len(writer.phase_history.get("test_phase", [])) == 1
-    assert writer.phase_history["test_phase"][0] == "Test message"
+    # History is only kept for writers without a callback
+    assert writer.phase_history == {}
+
+async def test_streaming_writer_sync_callback():
+    """Test a plain function callback is called directly, not awaited"""
+    received = []
+    writer = StreamingWriter(callback=received.append)
+
+    await stream_progress("test_phase", "Test message", writer)
+
+    assert not writer._is_async
+    assert received == [{"phase": "test_phase", "status": "in_progress", "progress_message": "Test message"}]
+
+async def test_streaming_writer_async_callable_object():
+    """Test an object with an async __call__ is awaited even though it isn't a coroutine function"""
+    class Recorder:
+        def __init__(self):
+            self.received = []
+
+        async def __call__(self, update):
+            self.received.append(update)
+
+    recorder = Recorder()
+    writer = StreamingWriter(callback=recorder)
+
+    await stream_progress("test_phase", "Test message", writer)
+
+    assert recorder.received == [{"phase": "test_phase", "status": "in_progress", "progress_message": "Test message"}]
+
+async def test_streaming_writer_encoded_callback(mock_callback):
+    """Test an encoded writer hands the callback JSON bytes of the update"""
+    writer = StreamingWriter(callback=mock_callback, encoded=True)
+
+    await stream_completion("test_phase", {"count": 2}, writer)
+
+    payload = mock_callback.call_args[0][0]
+    assert isinstance(payload, bytes)
+    assert orjson.loads(payload) == {"phase": "test_phase", "status": "completed", "details": {"count": 2}}
+
+async def test_streaming_writer_coalesces_progress(mock_callback):
+    """Test bursts of progress send only the latest per phase, flushed before completion"""
+    writer = StreamingWriter(callback=mock_callback, coalesce_window=60)
+
+    for i in range(5):
+        await stream_progress("test_phase", f"Step {i}", writer)
+    mock_callback.assert_not_called()
+
+    await stream_completion("test_phase", {}, writer)
+
+    sent = [call.args[0] for call in mock_callback.call_args_list]
+    assert [update["status"] for update in sent] == ["in_progress", "completed"]
+    assert sent[0]["progress_message"] == "Step 4"
+
+async def test_streaming_writer_batches_updates(mock_callback):
+    """Test batched writers hand the callback lists of updates by size, then on flush"""
+    writer = StreamingWriter(callback=mock_callback, batch_window=60, batch_size=3)
+
+    for i in range(4):
+        await stream_progress("test_phase", f"Step {i}", writer)
+    mock_callback.assert_called_once()
+    assert [u["progress_message"] for u in mock_callback.call_args[0][0]] == ["Step 0", "Step 1", "Step 2"]
+
+    await writer.flush()
+    assert mock_callback.call_count == 2
+    assert [u["progress_message"] for u in mock_callback.call_args[0][0]] == ["Step 3"]
+
+async def test_streaming_writer_timers_flush_held_updates():
+    """Test coalesced and batched updates go out when their windows elapse, without a flush call"""
+    received = []
+    writer = StreamingWriter(callback=received.append, coalesce_window=0.001, batch_window=0.001)
+
+    await stream_progress("a", "first", writer)
+    await stream_progress("a", "second", writer)
+    await stream_progress("b", "only", writer)
+    for _ in range(100):
+        if received:
+            break
+        await asyncio.sleep(0.001)
+
+    assert [[u["progress_message"] for u in batch] for batch in received] == [["second", "only"]]
 
 # Tests for search utilities
 def test_extract_urls_from_text():
@@ -147,3 +222,110 @@ def test_extract_urls_from_text():
     assert any(url.startswith("https://research.org/climate/123") for url in urls)
     assert "http://subdomain.example.net/path?query=value#fragment" in urls
     assert "example.com" not in urls  # Should not extract without protocol
+
+def test_extract_urls_from_text_dedups_in_order_and_trims_punctuation():
+    """Test repeated URLs are kept once, in first-seen order, without trailing punctuation"""
+    text = "See https://b.org/c. Also (https://a.com/x), https://en.wikipedia.org/wiki/Foo_(bar) and https://b.org/c"
+
+    assert extract_urls_from_text(text) == [
+        "https://b.org/c",
+        "https://a.com/x",
+        "https://en.wikipedia.org/wiki/Foo_(bar)",
+    ]
+
+def test_extract_urls_from_text_bare_hosts_and_long_input():
+    """Test bare hosts match without a path, and pathological input scans quickly"""
+    assert extract_urls_from_text("Visit https://example.com. Or http://localhost") == ["https://example.com"]
+
+    text = "http://" + "a." * 20000 + " https://x.io/" + "(" * 20000
+    assert extract_urls_from_text(text)[0].startswith("http://a.a.")
+
+def test_search_result_serializes_and_formats(mock_search_results):
+    """Test slotted SearchResults serialize like the old dicts and feed the prompt formatters"""
+    first = mock_search_results[0]
+    assert not hasattr(first, "__dict__")
+    assert orjson.loads(orjson.dumps(first))["sources"] == ["https://example.com/1"]
+    # Frozen with tuple sources, so equal results hash equal
+    assert len({first, dataclasses.replace(first)}) == 1
+
+    text = format_search_results_for_answer(mock_search_results)
+    assert "climate change effects on coral bleaching" in text
+    assert "Summary 2" in text
+
+async def test_semantic_cache_hits_paraphrases_above_threshold(tmp_path):
+    """Test near-duplicate embeddings hit, gray-zone ones miss, and the cache persists"""
+    vectors = {"coral reef bleaching": [1.0, 0.0], "coral bleaching in reefs": [0.99, 0.05], "ocean trade": [0.6, 0.8]}
+    embed = AsyncMock(side_effect=lambda text: vectors[text])
+    cache = SemanticCache("test", embed, threshold=0.92, directory=str(tmp_path))
+
+    payload, vector = await cache.lookup("coral reef bleaching")
+    assert payload is None
+    cache.add("coral reef bleaching", vector, {"summary": "bleaching"})
+
+    assert (await cache.lookup("coral bleaching in reefs"))[0] == {"summary": "bleaching"}
+    assert (await cache.lookup("ocean trade"))[0] is None
+
+    # Exact (normalized) repeats skip the embedding call
+    calls = embed.await_count
+    assert (await cache.lookup("  Coral reef BLEACHING "))[0] == {"summary": "bleaching"}
+    assert embed.await_count == calls
+
+    cache.save()
+    reloaded = SemanticCache("test", embed, threshold=0.92, directory=str(tmp_path))
+    assert len(reloaded) == 1
+    assert (await reloaded.lookup("coral bleaching in reefs"))[0] == {"summary": "bleaching"}
+
+def test_format_sources_list_dedups_in_first_seen_order():
+    """Test sources are listed once each, in first-seen order, capped at 20"""
+    sources = ["https://b.com", "https://a.com", "https://b.com"] + [f"https://{i}.org" for i in range(30)]
+
+    lines = format_sources_list(sources).splitlines()
+    assert lines[:3] == ["- https://b.com", "- https://a.com", "- https://0.org"]
+    assert len(lines) == 20
+
+def test_truncate_findings_cuts_at_line_break_within_budget():
+    """Test oversized findings are cut at the last line break that fits, short ones untouched"""
+    text = "first line\nsecond line\nthird line"
+
+    assert truncate_findings(text, 100) == text
+    assert truncate_findings(text, 25) == "first line\nsecond line"
+    assert truncate_findings("no breaks here", 5) == "no br"
+
+def test_insert_citation_markers_appends_to_matching_paragraph():
+    """Test markers go after the paragraph sharing the snippet's words, and present markers are kept once"""
+    text = "Coral reefs bleach when ocean temperatures rise sharply.\n\nTrade and markets are unrelated. [t-2]"
+    citations = [
+        {"short_url": "[t-1]", "segments": [{"snippet": "coral reefs bleach when ocean temperatures rise"}]},
+        {"short_url": "[t-2]", "segments": [{"snippet": "trade and markets are unrelated here"}]},
+    ]
+
+    assert insert_citation_markers(text, citations) == (
+        "Coral reefs bleach when ocean temperatures rise sharply. [t-1]"
+        "\n\nTrade and markets are unrelated. [t-2]"
+    )
+
+def test_resolve_urls_deduplicates_by_url():
+    """Test repeated grounding URLs resolve once, with consecutive short ids"""
+    chunks = [
+        {"web_search": {"url": "https://a.example.com", "title": "A"}},
+        {"web_search": {"url": "https://a.example.com", "title": "A again"}},
+        {"web_search": {}},
+        {"web_search": {"url": "https://b.example.com", "title": "B"}},
+    ]
+
+    resolved = resolve_urls(chunks, "t")
+
+    assert [r["orig_url"] for r in resolved] == ["https://a.example.com", "https://b.example.com"]
+    assert [r["short_url"] for r in resolved] == ["[t-1]", "[t-2]"]
+    assert resolved[0]["title"] == "A"
+
+def test_resolve_urls_deduplicates_by_title_and_domain():
+    """Test variants of one page on a domain resolve once unless domain dedup is off"""
+    chunks = [
+        {"web_search": {"url": "https://a.example.com/p?ref=1", "title": "Page"}},
+        {"web_search": {"url": "https://a.example.com/p?ref=2", "title": "Page"}},
+        {"web_search": {"url": "https://b.example.com/p", "title": "Page"}},
+    ]
+
+    assert [r["short_url"] for r in resolve_urls(chunks, "t")] == ["[t-1]", "[t-2]"]
+    assert len(resolve_urls(chunks, "t", dedup_by_domain=False)) == 3
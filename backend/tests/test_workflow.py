@@ -1,30 +1,56 @@
 import pytest
 import asyncio
-from unittest.mock import AsyncMock, patch, MagicMock
-from typing import Dict, Any, List
+from unittest.mock import patch
 
-from langgraph.graph import StateGraph, START, END
-from langgraph.constants import Send
+from langchain_core.messages import AIMessage, AIMessageChunk
 
-from workflow import ResearchWorkflow, run_research_agent
-from state import OverallState, WebSearchState
-from streaming import StreamingWriter
+from workflow import ImprovedResearchWorkflow, run_research_agent, workflow_instance
 from config import config
+from state import QueryPlan, Reflection
 
 # Test fixtures
-@pytest.fixture
+@pytest.fixture(scope="session")
 def research_workflow():
-    """Create a research workflow instance"""
-    return ResearchWorkflow()
+    """Create a research workflow instance (compiled once; tests only read it)"""
+    return ImprovedResearchWorkflow()
 
-@pytest.fixture
-def mock_writer():
-    """Create a mock StreamingWriter for testing"""
-    writer = AsyncMock(spec=StreamingWriter)
-    writer.send_progress_update = AsyncMock()
-    writer.send_completion_update = AsyncMock()
-    writer.send_error_update = AsyncMock()
-    return writer
+class FakeLLM:
+    """Stand-in for every get_llm() runnable: structured calls get a fixed schema instance,
+    plain calls a search summary, and streaming yields the answer in chunks"""
+
+    ANSWER_PARTS = ("Quantum computers use ", "qubits ", "[https://example.com/qubits].")
+
+    def __init__(self, schema):
+        # Compared by name: the graph's nodes see backend.state's copies of the schemas
+        self.schema_name = getattr(schema, "__name__", None)
+
+    async def ainvoke(self, messages):
+        if self.schema_name == "QueryPlan":
+            return QueryPlan(rationale="Cover the basics.", queries=["qubits", "quantum gates"])
+        if self.schema_name == "Reflection":
+            return Reflection(is_sufficient=True)
+        return AIMessage(content="Qubits hold superpositions (https://example.com/qubits).")
+
+    async def astream(self, messages):
+        for part in self.ANSWER_PARTS:
+            yield AIMessageChunk(content=part)
+
+@pytest.fixture(scope="session")
+def stubbed_result():
+    """Run the research agent once per session through the real graph with stubbed LLMs;
+    returns (result, streamed updates)"""
+    updates = []
+
+    async def record(update):
+        updates.append(update)
+
+    def fake_get_llm(model_name=None, schema=None, temperature=0.2):
+        return FakeLLM(schema)
+
+    # The workflow imports the node module as backend.nodes
+    with patch("backend.nodes.get_llm", fake_get_llm):
+        result = asyncio.run(run_research_agent("What is quantum computing?", stream_callback=record))
+    return result, updates
 
 @pytest.fixture
 def basic_state():
@@ -57,7 +83,6 @@ def test_workflow_graph_structure(research_workflow):
     expected_nodes = {
         "generate_queries", 
         "web_search", 
-        "aggregate_results", 
         "reflection", 
         "answer_generation"
     }
@@ -70,155 +95,80 @@ def test_workflow_graph_structure(research_workflow):
         assert node in actual_nodes
 
 # Tests for routing logic
-@pytest.mark.asyncio
-async def test_route_to_parallel_searches(research_workflow, basic_state):
-    """Test the routing to parallel web searches"""
-    # Test initial search routing
+def test_workflow_routing_suite(research_workflow, basic_state):
+    """Test initial and follow-up search routing on one scenario"""
+    # Initial search routing
     sends = research_workflow._route_to_parallel_searches(basic_state)
     
-    # Assertions
     assert len(sends) == 3  # Should match the number of queries
     for i, send in enumerate(sends):
-        assert send.target == "web_search"
-        assert send.state["query"] == basic_state["query_list"][i]
-        assert "task_id" in send.state
-        assert send.state["task_id"].startswith("initial_")
-        assert send.state["original_question"] == basic_state["original_question"]
-        assert send.state["is_followup"] is False
-
-@pytest.mark.asyncio
-async def test_route_to_parallel_searches_followup(research_workflow, basic_state):
-    """Test the routing to parallel web searches with follow-up queries"""
-    # Modify state to include follow-up queries
-    state = basic_state.copy()
-    state["follow_up_queries"] = [
-        "quantum error correction",
-        "quantum supremacy examples"
-    ]
-    state["research_loop_count"] = 1
+        assert send.node == "web_search"
+        assert send.arg["query"] == basic_state["query_list"][i]
+        assert send.arg["task_id"] == f"initial_{i}"
+        assert send.arg["original_question"] == basic_state["original_question"]
+        assert send.arg["is_followup"] is False
     
-    # Test follow-up search routing
-    sends = research_workflow._route_to_parallel_searches(state)
-    
-    # Assertions
-    assert len(sends) == 2  # Should match the number of follow-up queries
-    for i, send in enumerate(sends):
-        assert send.target == "web_search"
-        assert send.state["query"] == state["follow_up_queries"][i]
-        assert send.state["task_id"].startswith("followup_1_")
-        assert send.state["is_followup"] is True
-
-def test_decide_research_complete_sufficient(research_workflow):
-    """Test the decision to complete research when information is sufficient"""
+    # Follow-up search routing
     state = {
-        "is_sufficient": True,
+        **basic_state,
+        "follow_up_queries": ["quantum error correction", "quantum supremacy examples"],
         "research_loop_count": 1,
-        "follow_up_queries": ["query1", "query2"]
-    }
-    
-    result = research_workflow._decide_research_complete(state)
-    assert result == "answer_generation"
-
-def test_decide_research_complete_max_loops(research_workflow):
-    """Test the decision to complete research when max loops reached"""
-    state = {
-        "is_sufficient": False,
-        "research_loop_count": config.max_research_loops,
-        "follow_up_queries": ["query1", "query2"]
     }
+    sends = research_workflow._route_to_parallel_searches(state)
     
-    result = research_workflow._decide_research_complete(state)
-    assert result == "answer_generation"
-
-def test_decide_research_complete_no_followups(research_workflow):
-    """Test the decision to complete research when no follow-up queries"""
-    state = {
-        "is_sufficient": False,
-        "research_loop_count": 1,
-        "follow_up_queries": []
-    }
-    
-    result = research_workflow._decide_research_complete(state)
-    assert result == "answer_generation"
-
-def test_decide_research_continue(research_workflow):
-    """Test the decision to continue research"""
-    state = {
-        "is_sufficient": False,
-        "research_loop_count": 1,
-        "follow_up_queries": ["query1", "query2"]
-    }
-    
-    result = research_workflow._decide_research_complete(state)
-    assert result == "generate_queries"  # This will route to more searches
-
-# Tests for node wrappers
-@pytest.mark.asyncio
-async def test_generate_queries_wrapper(research_workflow, basic_state, mock_writer):
-    """Test the generate queries wrapper"""
-    state = basic_state.copy()
-    state["_writer"] = mock_writer
-    
-    with patch("workflow.generate_queries_node") as mock_node:
-        mock_node.return_value = {
-            "query_list": ["q1", "q2", "q3"],
-            "rationale": "Test rationale",
-            "current_phase": "search_web"
-        }
-        
-        # Execute wrapper
-        result = await research_workflow._generate_queries_wrapper(state)
-        
-        # Verify node was called with correct arguments
-        mock_node.assert_called_once_with(state, mock_writer)
-        
-        # Verify result is passed through
-        assert result["query_list"] == ["q1", "q2", "q3"]
-        assert result["rationale"] == "Test rationale"
-        assert result["current_phase"] == "search_web"
-
-# Tests for demo mode
-@pytest.mark.asyncio
-async def test_run_demo_research(research_workflow, mock_writer):
-    """Test the demo research flow"""
-    result = await research_workflow._run_demo_research("What is quantum computing?", mock_writer.send_update)
+    assert len(sends) == 2  # Should match the number of follow-up queries
+    for i, send in enumerate(sends):
+        assert send.node == "web_search"
+        assert send.arg["query"] == state["follow_up_queries"][i]
+        assert send.arg["task_id"] == f"followup_1_{i}"
+        assert send.arg["is_followup"] is True
+
+@pytest.mark.parametrize("state,expected", [
+    # Sufficient information
+    ({"is_sufficient": True, "research_loop_count": 1, "follow_up_queries": ["query1", "query2"]}, "answer_generation"),
+    # Max loops reached
+    ({"is_sufficient": False, "research_loop_count": config.max_research_loops, "follow_up_queries": ["query1", "query2"]}, "answer_generation"),
+    # No follow-up queries
+    ({"is_sufficient": False, "research_loop_count": 1, "follow_up_queries": []}, "answer_generation"),
+    # Continue: routes to more searches
+    ({"is_sufficient": False, "research_loop_count": 1, "follow_up_queries": ["query1", "query2"]}, "generate_queries"),
+], ids=["sufficient", "max_loops", "no_followups", "continue"])
+def test_decide_research_complete(research_workflow, state, expected):
+    """Test the decision to complete research or loop back for more"""
+    assert research_workflow._decide_research_complete(state) == expected
+
+# End-to-end run through the compiled graph
+def test_run_research_agent(stubbed_result):
+    """Test the main research agent entry point runs every node and streams its progress"""
+    result, updates = stubbed_result
     
-    # Verify demo output structure
-    assert "success" in result
-    assert result["success"] is True
-    assert "final_answer" in result
-    assert len(result["final_answer"]) > 0
-    assert "citations" in result
-    assert len(result["citations"]) > 0
+    assert result["final_answer"] == "".join(FakeLLM.ANSWER_PARTS)
+    assert result["citations"] == ["https://example.com/qubits"]
+    assert result["research_summary"]["total_search_results"] == 2
+    assert result["research_loop_count"] == 1
+    assert not result["errors"]
     
-    # Verify streaming updates were sent
-    assert mock_writer.send_update.called
+    # State updates, answer token deltas and the completion were all streamed
+    update_types = {update.get("type") for update in updates}
+    assert {"state_update", "complete"} <= update_types
+    deltas = [update["delta"] for update in updates if "delta" in update]
+    assert "".join(deltas) == result["final_answer"]
 
 # Integration test for run_research_agent
-@pytest.mark.asyncio
-async def test_run_research_agent_demo_mode():
-    """Test the main research agent entry point in demo mode"""
-    # Force demo mode
-    with patch("config.config.demo_mode", True):
-        result = await run_research_agent("What is quantum computing?")
-        
-        # Verify result structure
-        assert "success" in result
-        assert result["success"] is True
-        assert "final_answer" in result
-        assert len(result["final_answer"]) > 0
-        assert "citations" in result
-        assert "research_summary" in result
-
-@pytest.mark.asyncio
 async def test_run_research_agent_error_handling():
-    """Test error handling in the research agent entry point"""
-    # Force validation to fail
-    with patch("config.config.validate", return_value=False):
-        result = await run_research_agent("What is quantum computing?")
-        
-        # Verify error structure
-        assert "success" in result
-        assert result["success"] is False
-        assert "error" in result
-        assert "Missing required API keys" in result["error"]
+    """Test a failing research stream is reported to the callback and re-raised"""
+    async def failing_stream(question, progress_callback=None):
+        raise RuntimeError("stream failed")
+        yield  # Makes this an async generator like stream_research
+
+    updates = []
+
+    async def record(update):
+        updates.append(update)
+
+    with patch.object(workflow_instance, "stream_research", failing_stream), \
+         pytest.raises(RuntimeError, match="stream failed"):
+        await run_research_agent("What is quantum computing?", stream_callback=record)
+
+    assert updates[-1]["type"] == "error"
+    assert updates[-1]["error"] == "stream failed"
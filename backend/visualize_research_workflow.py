@@ -11,138 +11,73 @@ This script provides multiple visualization methods for the LangGraph workflow:
 Based on official LangGraph documentation patterns.
 """
 
+import hashlib
+import html
 import os
 import sys
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 from pathlib import Path
 
 # Add backend to path for imports
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '.')))
 
-try:
+OUTPUT_DIR = Path("visualizations")
+
+@lru_cache(maxsize=1)
+def _output_dir():
+    """OUTPUT_DIR, created on first use (once per run rather than in every function)"""
+    OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
+    return OUTPUT_DIR
+
+# The workflows (and LangGraph/LLM clients behind them) are imported on first use.
+# The compiled graph never changes at runtime, so each rendering is computed once
+# and shared by every entry point below
+@lru_cache(maxsize=1)
+def _improved_graph():
     from workflow import improved_workflow
+    return improved_workflow.graph_repr
+
+@lru_cache(maxsize=1)
+def _original_graph():
     from workflow import research_workflow  # Original workflow for comparison
-    print("✅ Successfully imported both workflow implementations")
-except ImportError as e:
-    print(f"❌ Import error: {e}")
-    print("Make sure you're running this from the backend directory")
-    sys.exit(1)
+    return research_workflow.app.get_graph()
 
-def visualize_improved_workflow():
-    """Visualize the improved LangGraph workflow using native capabilities"""
-    
-    print("\n" + "="*60)
-    print("🔍 DEEP RESEARCH AGENT - WORKFLOW VISUALIZATION")
-    print("="*60)
-    
-    # Get the compiled graph
-    graph = improved_workflow.app
-    graph_structure = graph.get_graph()
-    
-    print(f"\n📊 Graph Statistics:")
-    print(f"   • Nodes: {len(graph_structure.nodes)}")
-    print(f"   • Edges: {len(graph_structure.edges)}")
-    
-    # 1. ASCII Visualization
-    print("\n" + "-"*50)
-    print("📋 ASCII GRAPH REPRESENTATION")
-    print("-"*50)
-    try:
-        ascii_graph = graph_structure.draw_ascii()
-        print(ascii_graph)
-    except Exception as e:
-        print(f"❌ ASCII visualization failed: {e}")
-    
-    # 2. Mermaid Source Code
-    print("\n" + "-"*50)
-    print("🎨 MERMAID DIAGRAM SOURCE")
-    print("-"*50)
-    try:
-        mermaid_code = graph_structure.draw_mermaid()
-        print(mermaid_code)
-        print(f"\n💡 Copy the above code to https://mermaid.live to view the diagram")
-    except Exception as e:
-        print(f"❌ Mermaid source generation failed: {e}")
-    
-    # 3. Save Mermaid PNG (if possible)
-    print("\n" + "-"*50)
-    print("🖼️  MERMAID PNG GENERATION")
-    print("-"*50)
-    try:
+@lru_cache(maxsize=1)
+def _mermaid_source():
+    from workflow import improved_workflow
+    return improved_workflow.mermaid_source
+
+@lru_cache(maxsize=1)
+def _ascii_graph():
+    return _improved_graph().draw_ascii()
+
+def _render_png(graph_structure, output_dir):
+    """
+    Return (png_data, png_file, reused) for the graph's Mermaid PNG.
+    PNGs are keyed by the Mermaid source, so an unchanged graph skips the render.
+    """
+    signature = hashlib.sha1(_mermaid_source().encode()).hexdigest()[:12]
+    rendered_file = output_dir / f"research_workflow.{signature}.png"
+    reused = rendered_file.exists()
+    if reused:
+        png_data = rendered_file.read_bytes()
+    else:
         png_data = graph_structure.draw_mermaid_png()
-        
-        # Save to file
-        output_dir = Path("visualizations")
-        output_dir.mkdir(exist_ok=True)
-        
-        png_file = output_dir / "research_workflow.png"
-        with open(png_file, "wb") as f:
-            f.write(png_data)
-        
-        print(f"✅ PNG saved to: {png_file.absolute()}")
-        
-        # Also try to display if in Jupyter
-        try:
-            from IPython.display import Image, display
-            display(Image(png_data))
-            print("✅ Displayed in Jupyter notebook")
-        except ImportError:
-            print("💡 To view in Jupyter: from IPython.display import Image; Image('research_workflow.png')")
-            
-    except Exception as e:
-        print(f"❌ PNG generation failed: {e}")
-        print("💡 Install graphviz and pygraphviz: pip install pygraphviz")
-    
-    # 4. Node and Edge Analysis
-    print("\n" + "-"*50)
-    print("🔍 DETAILED GRAPH ANALYSIS")
-    print("-"*50)
-    
-    print("\n📍 NODES:")
-    for node_id in graph_structure.nodes:
-        node_data = graph_structure.nodes[node_id]
-        print(f"   • {node_id}")
-        if hasattr(node_data, 'name'):
-            print(f"     Name: {node_data.name}")
-    
-    print("\n🔗 EDGES:")
-    for edge in graph_structure.edges:
-        source = edge.source
-        target = edge.target
-        print(f"   • {source} → {target}")
-    
-    # 5. State Schema Analysis
-    print("\n" + "-"*50)
-    print("📋 STATE SCHEMA ANALYSIS")
-    print("-"*50)
+        rendered_file.write_bytes(png_data)
     
-    # Import state for analysis
-    try:
-        from state import OverallState
-        print("\n🏗️  State Structure (OverallState):")
-        
-        # Get type annotations if available
-        if hasattr(OverallState, '__annotations__'):
-            for field, field_type in OverallState.__annotations__.items():
-                print(f"   • {field}: {field_type}")
-        else:
-            print("   State structure defined as TypedDict")
-            
-    except Exception as e:
-        print(f"❌ State analysis failed: {e}")
+    # Refresh the stable name atomically, only when the signature moved
+    png_file = output_dir / "research_workflow.png"
+    sig_file = output_dir / "research_workflow.sig"
+    if not png_file.exists() or not sig_file.exists() or sig_file.read_text().strip() != signature:
+        tmp_file = png_file.with_suffix(".png.tmp")
+        tmp_file.write_bytes(png_data)
+        os.replace(tmp_file, png_file)
+        sig_file.write_text(signature)
+    return png_data, png_file, reused
 
-def create_interactive_html():
-    """Create an interactive HTML visualization"""
-    
-    print("\n" + "-"*50)
-    print("🌐 INTERACTIVE HTML VISUALIZATION")
-    print("-"*50)
-    
-    try:
-        # Create HTML with embedded Mermaid
-        graph = improved_workflow.app
-        mermaid_code = graph.get_graph().draw_mermaid()
-        
-        html_content = f"""
+# Page for create_interactive_html; filled in with str.format
+HTML_TEMPLATE = """
 <!DOCTYPE html>
 <html>
 <head>
@@ -219,7 +154,7 @@ def create_interactive_html():
         <div class="info">
             <h3>📝 Mermaid Source Code</h3>
             <div class="code">
-{mermaid_code.replace('<', '&lt;').replace('>', '&gt;')}
+{mermaid_source}
             </div>
         </div>
     </div>
@@ -237,14 +172,133 @@ def create_interactive_html():
 </body>
 </html>
 """
+
+def visualize_improved_workflow():
+    """Visualize the improved LangGraph workflow using native capabilities"""
+    
+    print("\n" + "="*60)
+    print("🔍 DEEP RESEARCH AGENT - WORKFLOW VISUALIZATION")
+    print("="*60)
+    
+    # Get the compiled graph
+    graph_structure = _improved_graph()
+    
+    print(f"\n📊 Graph Statistics:")
+    print(f"   • Nodes: {len(graph_structure.nodes)}")
+    print(f"   • Edges: {len(graph_structure.edges)}")
+    
+    output_dir = _output_dir()
+    
+    # The three artifacts are independent, and the PNG (a remote Mermaid render or
+    # graphviz) is by far the slowest: produce them concurrently, print them in order
+    pool = ThreadPoolExecutor(max_workers=3)
+    ascii_future = pool.submit(_ascii_graph)
+    mermaid_future = pool.submit(_mermaid_source)
+    png_future = pool.submit(_render_png, graph_structure, output_dir)
+    pool.shutdown(wait=False)  # Workers finish the submitted jobs, then exit
+    
+    # 1. ASCII Visualization
+    print("\n" + "-"*50)
+    print("📋 ASCII GRAPH REPRESENTATION")
+    print("-"*50)
+    try:
+        ascii_graph = ascii_future.result()
+        print(ascii_graph)
+    except Exception as e:
+        print(f"❌ ASCII visualization failed: {e}")
+    
+    # 2. Mermaid Source Code
+    print("\n" + "-"*50)
+    print("🎨 MERMAID DIAGRAM SOURCE")
+    print("-"*50)
+    try:
+        mermaid_code = mermaid_future.result()
+        print(mermaid_code)
+        print(f"\n💡 Copy the above code to https://mermaid.live to view the diagram")
+    except Exception as e:
+        print(f"❌ Mermaid source generation failed: {e}")
+    
+    # 3. Save Mermaid PNG (if possible)
+    print("\n" + "-"*50)
+    print("🖼️  MERMAID PNG GENERATION")
+    print("-"*50)
+    try:
+        png_data, png_file, reused = png_future.result()
+        if reused:
+            print("♻️  Graph unchanged, reusing the previously rendered PNG")
+        
+        print(f"✅ PNG saved to: {png_file.absolute()}")
+        
+        # Also try to display if in Jupyter
+        try:
+            from IPython.display import Image, display
+            display(Image(png_data))
+            print("✅ Displayed in Jupyter notebook")
+        except ImportError:
+            print("💡 To view in Jupyter: from IPython.display import Image; Image('research_workflow.png')")
+            
+    except Exception as e:
+        print(f"❌ PNG generation failed: {e}")
+        print("💡 Install graphviz and pygraphviz: pip install pygraphviz")
+    
+    # 4. Node and Edge Analysis
+    print("\n" + "-"*50)
+    print("🔍 DETAILED GRAPH ANALYSIS")
+    print("-"*50)
+    
+    # One write per section rather than one print per node/edge
+    node_lines = ["\n📍 NODES:"]
+    for node_id, node_data in graph_structure.nodes.items():
+        node_lines.append(f"   • {node_id}")
+        if hasattr(node_data, 'name'):
+            node_lines.append(f"     Name: {node_data.name}")
+    sys.stdout.write("\n".join(node_lines) + "\n")
+    
+    edge_lines = ["\n🔗 EDGES:"]
+    edge_lines.extend(f"   • {edge.source} → {edge.target}" for edge in graph_structure.edges)
+    sys.stdout.write("\n".join(edge_lines) + "\n")
+    
+    # 5. State Schema Analysis
+    print("\n" + "-"*50)
+    print("📋 STATE SCHEMA ANALYSIS")
+    print("-"*50)
+    
+    # Import state for analysis
+    try:
+        from state import OverallState
+        print("\n🏗️  State Structure (OverallState):")
+        
+        # Get type annotations if available
+        if hasattr(OverallState, '__annotations__'):
+            for field, field_type in OverallState.__annotations__.items():
+                print(f"   • {field}: {field_type}")
+        else:
+            print("   State structure defined as TypedDict")
+            
+    except Exception as e:
+        print(f"❌ State analysis failed: {e}")
+
+def create_interactive_html():
+    """Create an interactive HTML visualization"""
+    
+    print("\n" + "-"*50)
+    print("🌐 INTERACTIVE HTML VISUALIZATION")
+    print("-"*50)
+    
+    try:
+        # Create HTML with embedded Mermaid
+        mermaid_code = _mermaid_source()
+        
+        html_content = HTML_TEMPLATE.format(
+            mermaid_code=mermaid_code,
+            mermaid_source=html.escape(mermaid_code, quote=False),
+        )
         
         # Save HTML file
-        output_dir = Path("visualizations")
-        output_dir.mkdir(exist_ok=True)
+        output_dir = _output_dir()
         
         html_file = output_dir / "research_workflow.html"
-        with open(html_file, "w", encoding="utf-8") as f:
-            f.write(html_content)
+        html_file.write_text(html_content, encoding="utf-8")
         
         print(f"✅ Interactive HTML saved to: {html_file.absolute()}")
         print(f"💡 Open in browser: file://{html_file.absolute()}")
@@ -261,16 +315,20 @@ def compare_workflows():
     
     try:
         # Original workflow
-        original_graph = research_workflow.app.get_graph()
-        improved_graph = improved_workflow.app.get_graph()
+        original_graph = _original_graph()
+        improved_graph = _improved_graph()
         
         print(f"\n📊 Comparison:")
         print(f"   Original  - Nodes: {len(original_graph.nodes)}, Edges: {len(original_graph.edges)}")
         print(f"   Improved  - Nodes: {len(improved_graph.nodes)}, Edges: {len(improved_graph.edges)}")
         
         print(f"\n🔍 Node Differences:")
-        original_nodes = set(original_graph.nodes.keys())
-        improved_nodes = set(improved_graph.nodes.keys())
+        if original_graph is improved_graph:
+            # Both names refer to the same workflow; nothing to diff
+            print("   ✅ Same nodes in both workflows")
+            return
+        original_nodes = frozenset(original_graph.nodes)
+        improved_nodes = frozenset(improved_graph.nodes)
         
         if original_nodes == improved_nodes:
             print("   ✅ Same nodes in both workflows")
@@ -291,9 +349,16 @@ def main():
     
     print("🚀 Starting Deep Research Agent Workflow Visualization...")
     
+    try:
+        _improved_graph()
+        print("✅ Successfully imported the workflow implementation")
+    except ImportError as e:
+        print(f"❌ Import error: {e}")
+        print("Make sure you're running this from the backend directory")
+        sys.exit(1)
+    
     # Create output directory
-    output_dir = Path("visualizations")
-    output_dir.mkdir(exist_ok=True)
+    output_dir = _output_dir()
     print(f"📁 Output directory: {output_dir.absolute()}")
     
     # Run visualizations
@@ -1,21 +1,96 @@
 import asyncio
-import json
+import logging
 import time
-from datetime import datetime
+from functools import cached_property
+from types import MappingProxyType
 from typing import Dict, Any, List, Optional, AsyncIterator
 from langgraph.graph import StateGraph, START, END
 from langgraph.constants import Send
 from langchain_core.messages import HumanMessage, AIMessage
 
-from backend.state import OverallState, WebSearchState
+from backend.state import OverallState
 from backend.nodes import (
     generate_queries_node, 
     web_search_node, 
-    aggregate_search_results,
+    web_search_batch_node,
     reflection_node, 
     answer_generation_node
 )
-from backend.config import config
+from backend.config import Phase, config
+
+
+# Child of the API's "research" logger, so records share its queued handler and LOG_LEVEL
+logger = logging.getLogger("research.workflow")
+
+# Immutable starting values shared by every run. The list and dict fields are built
+# per run instead, since the add reducers and nodes extend them
+_INITIAL_STATE_DEFAULTS = MappingProxyType({
+    "rationale": "",
+    "is_sufficient": False,
+    "knowledge_gap": "",
+    "research_loop_count": 0,
+    "total_queries_run": 0,
+    "final_answer": "",
+    "current_phase": Phase.GENERATING_QUERIES,
+})
+
+# Message class -> serialized "type"; subclasses (e.g. message chunks) are resolved
+# once with issubclass and remembered, anything else maps to None
+_MESSAGE_KINDS: Dict[type, Optional[str]] = {HumanMessage: "human", AIMessage: "ai"}
+
+
+def _message_kind(message_type: type) -> Optional[str]:
+    try:
+        return _MESSAGE_KINDS[message_type]
+    except KeyError:
+        if issubclass(message_type, HumanMessage):
+            kind = "human"
+        elif issubclass(message_type, AIMessage):
+            kind = "ai"
+        else:
+            kind = None
+        _MESSAGE_KINDS[message_type] = kind
+        return kind
+
+
+def _clean_messages(messages: List[Any]) -> List[Any]:
+    """Convert LangChain messages to JSON-safe dicts (other objects to str)"""
+    cleaned = []
+    for msg in messages:
+        kind = _message_kind(type(msg))
+        cleaned.append({"type": kind, "content": msg.content} if kind else str(msg))
+    return cleaned
+
+
+def _node_start_event(event: Dict[str, Any], event_type: str, name: str, data: Any, ts: float) -> Dict[str, Any]:
+    return {"type": "node_start", "node": name, "data": {"message": f"Starting {name}"}, "timestamp": ts}
+
+def _node_complete_event(event: Dict[str, Any], event_type: str, name: str, data: Any, ts: float) -> Dict[str, Any]:
+    return {"type": "node_complete", "node": name, "data": data, "timestamp": ts}
+
+def _node_stream_event(event: Dict[str, Any], event_type: str, name: str, data: Any, ts: float) -> Dict[str, Any]:
+    return {"type": "node_stream", "node": name, "data": data, "timestamp": ts}
+
+def _llm_token_event(event: Dict[str, Any], event_type: str, name: str, data: Any, ts: float) -> Dict[str, Any]:
+    # LLM streaming tokens are attributed to the graph node making the call
+    return {
+        "type": "llm_token",
+        "node": event.get("metadata", {}).get("langgraph_node", name),
+        "data": data,
+        "timestamp": ts
+    }
+
+def _other_event(event: Dict[str, Any], event_type: str, name: str, data: Any, ts: float) -> Dict[str, Any]:
+    # Forward other events
+    return {"type": "event", "event_type": event_type, "node": name, "data": data, "timestamp": ts}
+
+# Frontend update builders by astream_events event type; anything else uses _other_event
+_EVENT_BUILDERS = {
+    "on_chain_start": _node_start_event,
+    "on_chain_end": _node_complete_event,
+    "on_chain_stream": _node_stream_event,
+    "on_chat_model_stream": _llm_token_event,
+}
 
 
 class ImprovedResearchWorkflow:
@@ -27,6 +102,16 @@ class ImprovedResearchWorkflow:
         self.graph = self._build_graph()
         self.app = self.graph.compile()
     
+    @cached_property
+    def graph_repr(self):
+        """Drawable structure of the compiled app (get_graph() walks the whole graph)"""
+        return self.app.get_graph()
+    
+    @cached_property
+    def mermaid_source(self) -> str:
+        """Mermaid diagram source for the compiled app"""
+        return self.graph_repr.draw_mermaid()
+    
     def _build_graph(self) -> StateGraph:
         """Build the LangGraph workflow with native streaming support"""
         
@@ -35,26 +120,29 @@ class ImprovedResearchWorkflow:
         
         # Add nodes
         workflow.add_node("generate_queries", generate_queries_node)
-        workflow.add_node("web_search", web_search_node)
-        workflow.add_node("aggregate_results", aggregate_search_results)
+        workflow.add_node(
+            "web_search",
+            web_search_batch_node if config.search_batching_enabled else web_search_node
+        )
         workflow.add_node("reflection", reflection_node)
         workflow.add_node("answer_generation", answer_generation_node)
         
         # Define the main research flow
         workflow.add_edge(START, "generate_queries")
         
-        # Handle parallel web searches
-        workflow.add_conditional_edges(
-            "generate_queries",
-            self._route_to_parallel_searches,
-            ["web_search"]
-        )
-        
-        # After web search, aggregate results
-        workflow.add_edge("web_search", "aggregate_results")
+        if config.search_batching_enabled:
+            # One batched search covers every query of the round
+            workflow.add_edge("generate_queries", "web_search")
+        else:
+            # Handle parallel web searches
+            workflow.add_conditional_edges(
+                "generate_queries",
+                self._route_to_parallel_searches,
+                ["web_search"]
+            )
         
-        # After aggregation, reflect on the information
-        workflow.add_edge("aggregate_results", "reflection")
+        # After web search, aggregate the results and reflect on them in one node
+        workflow.add_edge("web_search", "reflection")
         
         # After reflection, either continue research or generate final answer
         workflow.add_conditional_edges(
@@ -70,98 +158,115 @@ class ImprovedResearchWorkflow:
     
     def _route_to_parallel_searches(self, state: OverallState) -> List[Send]:
         """Route each query to parallel web search tasks"""
-        queries = state.get("query_list", [])
-        follow_up_queries = state.get("follow_up_queries", [])
+        get = state.get
+        follow_up_queries = get("follow_up_queries", [])
+        is_followup = bool(follow_up_queries)
         
         # Determine which queries to search
-        if follow_up_queries:
+        if is_followup:
             search_queries = follow_up_queries
-            task_prefix = f"followup_{state.get('research_loop_count', 1)}"
+            task_prefix = f"followup_{get('research_loop_count', 1)}"
         else:
-            search_queries = queries
+            search_queries = get("query_list", [])
             task_prefix = "initial"
         
         # Create Send instructions for parallel execution
-        sends = []
-        for i, query in enumerate(search_queries):
-            sends.append(Send("web_search", {
+        original_question = get("original_question", "")
+        return [
+            Send("web_search", {
                 "query": query,
                 "task_id": f"{task_prefix}_{i}",
-                "original_question": state.get("original_question", ""),
-                "is_followup": bool(follow_up_queries)
-            }))
-        
-        return sends
+                "original_question": original_question,
+                "is_followup": is_followup
+            })
+            for i, query in enumerate(search_queries)
+        ]
     
     def _decide_research_complete(self, state: OverallState) -> str:
         """Decide whether to continue research or generate final answer"""
-        is_sufficient = state.get("is_sufficient", True)
-        research_loop_count = state.get("research_loop_count", 0)
-        follow_up_queries = state.get("follow_up_queries", [])
-        
-        # Check termination conditions
-        max_loops_reached = research_loop_count >= config.max_research_loops
-        no_follow_ups = len(follow_up_queries) == 0
-        
-        if is_sufficient or max_loops_reached or no_follow_ups:
+        get = state.get
+        # Termination conditions, evaluated lazily: sufficient, loop budget spent, nothing to follow up
+        if (
+            get("is_sufficient", True)
+            or get("research_loop_count", 0) >= config.max_research_loops
+            or not get("follow_up_queries")
+        ):
             return "answer_generation"
-        else:
-            return "generate_queries"
+        return "generate_queries"
     
-    async def stream_research(self, question: str) -> AsyncIterator[Dict[str, Any]]:
+    def _initial_state(self, question: str) -> OverallState:
+        """Build the starting workflow state for a research question"""
+        return {
+            **_INITIAL_STATE_DEFAULTS,
+            "messages": [HumanMessage(content=question)],
+            "original_question": question,
+            "query_list": [],
+            "search_results": [],
+            "sources_gathered": [],
+            "follow_up_queries": [],
+            "citations": [],
+            "research_summary": {},
+            "timeline_updates": [],
+            "errors": [],
+            "warnings": [],
+        }
+
+    async def run_research(self, question: str) -> Dict[str, Any]:
+        """
+        Run research to completion without streaming and return the final state.
+        Skips building intermediate state snapshots for callers that only need the result.
+        """
+        return await self.app.ainvoke(
+            self._initial_state(question),
+            config={"configurable": {"thread_id": f"research-{time.time_ns()}"}}
+        )
+
+    async def run_many(self, questions: List[str], concurrency: int = 4) -> List[Any]:
+        """
+        Run several research questions concurrently, at most `concurrency` at a time.
+        Results come back in input order; a failed run is returned as its exception.
+        """
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def run_one(question: str) -> Dict[str, Any]:
+            async with semaphore:
+                return await self.run_research(question)
+
+        return await asyncio.gather(*(run_one(q) for q in questions), return_exceptions=True)
+
+    async def stream_research(self, question: str, progress_callback=None) -> AsyncIterator[Dict[str, Any]]:
         """
         Stream research using LangGraph's native streaming capabilities
         Based on: https://langchain-ai.github.io/langgraph/cloud/how-tos/use_stream_react/
+        progress_callback, if given, is awaited with answer token deltas as they stream.
         """
-        # Initialize state
-        initial_state = OverallState(
-            messages=[HumanMessage(content=question)],
-            original_question=question,
-            query_list=[],
-            rationale="",
-            search_results=[],
-            sources_gathered=[],
-            is_sufficient=False,
-            knowledge_gap="",
-            follow_up_queries=[],
-            research_loop_count=0,
-            total_queries_run=0,
-            final_answer="",
-            citations=[],
-            research_summary={},
-            timeline_updates=[],
-            current_phase="generating_queries",
-            errors=[],
-            warnings=[]
-        )
+        initial_state = self._initial_state(question)
         
-        print(f"[DEBUG] Starting LangGraph stream for: {question}")
+        logger.debug("Starting LangGraph stream for: %s", question)
         
         # Stream with native LangGraph streaming - stream_mode="values"
+        cleaned_data: Dict[str, Any] = {}
+        # The add_messages reducer only appends, so each message is cleaned once: state
+        # updates carry the messages added since the previous update, and the complete
+        # event carries all of them
+        cleaned_messages: List[Any] = []
         try:
             async for chunk in self.app.astream(
                 initial_state,
                 stream_mode="values",  # Stream state values after each node
-                config={"configurable": {"thread_id": f"research-{int(time.time())}"}}
+                config={"configurable": {
+                    "thread_id": f"research-{time.time_ns()}",
+                    "progress_callback": progress_callback
+                }}
             ):
                 # Transform LangGraph state updates to frontend format
                 current_phase = chunk.get("current_phase", "unknown")
                 
                 # Serialize chunk to JSON-safe structure
-                cleaned_data: Dict[str, Any] = {}
-                for k, v in chunk.items():
-                    if k == "messages":
-                        cleaned_msgs = []
-                        for msg in v:
-                            if isinstance(msg, HumanMessage):
-                                cleaned_msgs.append({"type": "human", "content": msg.content})
-                            elif isinstance(msg, AIMessage):
-                                cleaned_msgs.append({"type": "ai", "content": msg.content})
-                            else:
-                                cleaned_msgs.append(str(msg))
-                        cleaned_data["messages"] = cleaned_msgs
-                    else:
-                        cleaned_data[k] = v
+                messages = chunk.get("messages") or ()
+                new_messages = _clean_messages(messages[len(cleaned_messages):])
+                cleaned_messages.extend(new_messages)
+                cleaned_data = {**chunk, "messages": new_messages}
                 
                 # Build streaming update with cleaned data
                 update = {
@@ -171,32 +276,17 @@ class ImprovedResearchWorkflow:
                     "data": cleaned_data
                 }
                 
-                print(f"[DEBUG] Streaming state update: phase={current_phase}")
+                logger.debug("Streaming state update: phase=%s", current_phase)
                 yield update
             
-            # Send final completion signal with the last chunk (cleaned)
-            # Re-serialize the last chunk to JSON-safe structure
-            final_cleaned: Dict[str, Any] = {}
-            for k, v in chunk.items():
-                if k == "messages":
-                    msgs = []
-                    for msg in v:
-                        if isinstance(msg, HumanMessage):
-                            msgs.append({"type": "human", "content": msg.content})
-                        elif isinstance(msg, AIMessage):
-                            msgs.append({"type": "ai", "content": msg.content})
-                        else:
-                            msgs.append(str(msg))
-                    final_cleaned["messages"] = msgs
-                else:
-                    final_cleaned[k] = v
+            # Send final completion signal with the last chunk, already cleaned above
             yield {
                 "type": "complete",
-                "data": final_cleaned
+                "data": {**cleaned_data, "messages": cleaned_messages}
             }
             
         except Exception as e:
-            print(f"[DEBUG] Error in stream_research: {e}")
+            logger.error("Error in stream_research: %s", e)
             yield {
                 "type": "error",
                 "error": str(e),
@@ -208,33 +298,13 @@ class ImprovedResearchWorkflow:
         Stream research using LangGraph's event streaming for more granular updates
         Based on LangGraph astream_events for detailed node-level events
         """
-        # Initialize state
-        initial_state = OverallState(
-            messages=[HumanMessage(content=question)],
-            original_question=question,
-            query_list=[],
-            rationale="",
-            search_results=[],
-            sources_gathered=[],
-            is_sufficient=False,
-            knowledge_gap="",
-            follow_up_queries=[],
-            research_loop_count=0,
-            total_queries_run=0,
-            final_answer="",
-            citations=[],
-            research_summary={},
-            timeline_updates=[],
-            current_phase="generating_queries",
-            errors=[],
-            warnings=[]
-        )
+        initial_state = self._initial_state(question)
         
-        print(f"[DEBUG] Starting LangGraph event stream for: {question}")
+        logger.debug("Starting LangGraph event stream for: %s", question)
         
         # Generate thread ID once for consistent state tracking
-        thread_id = f"research-{int(time.time())}"
-        config = {"configurable": {"thread_id": thread_id}}
+        thread_id = f"research-{time.time_ns()}"
+        run_config = {"configurable": {"thread_id": thread_id}}
         
         # Store the final state as we process events
         final_state_data = {}
@@ -244,59 +314,27 @@ class ImprovedResearchWorkflow:
             async for event in self.app.astream_events(
                 initial_state,
                 version="v1",
-                config=config
+                config=run_config
             ):
                 # Transform LangGraph events to frontend-friendly format
-                event_type = event.get("event", "")
-                event_name = event.get("name", "")
+                get = event.get
+                event_type = get("event", "")
+                event_name = get("name", "")
+                # A fresh {} only when the (almost always present) data key is missing
+                data = get("data")
+                if data is None:
+                    data = {}
+                ts = time.time()
                 
-                if event_type == "on_chain_start":
-                    yield {
-                        "type": "node_start",
-                        "node": event_name,
-                        "data": {"message": f"Starting {event_name}"},
-                        "timestamp": time.time()
-                    }
-                elif event_type == "on_chain_end":
-                    # Capture final answer if this is the answer_generation node
-                    if event_name == "answer_generation":
-                        output_data = event.get("data", {})
-                        if output_data and isinstance(output_data, dict):
-                            final_state_data.update(output_data.get("output", {}))
-                    
-                    yield {
-                        "type": "node_complete", 
-                        "node": event_name,
-                        "data": event.get("data", {}),
-                        "timestamp": time.time()
-                    }
-                elif event_type == "on_chain_stream":
-                    yield {
-                        "type": "node_stream",
-                        "node": event_name,
-                        "data": event.get("data", {}),
-                        "timestamp": time.time()
-                    }
-                elif event_type == "on_chat_model_stream":
-                    # Handle LLM streaming tokens
-                    yield {
-                        "type": "llm_token",
-                        "node": event_name,
-                        "data": event.get("data", {}),
-                        "timestamp": time.time()
-                    }
-                else:
-                    # Forward other events
-                    yield {
-                        "type": "event",
-                        "event_type": event_type,
-                        "node": event_name,
-                        "data": event.get("data", {}),
-                        "timestamp": time.time()
-                    }
+                # Capture final answer if this is the answer_generation node
+                if event_type == "on_chain_end" and event_name == "answer_generation":
+                    if data and isinstance(data, dict):
+                        final_state_data.update(data.get("output", {}))
+                
+                yield _EVENT_BUILDERS.get(event_type, _other_event)(event, event_type, event_name, data, ts)
                     
         except Exception as e:
-            print(f"[DEBUG] Error in stream_research_events: {e}")
+            logger.error("Error in stream_research_events: %s", e)
             yield {
                 "type": "error",
                 "error": str(e),
@@ -306,11 +344,11 @@ class ImprovedResearchWorkflow:
         # After streaming is complete, get the final state and emit complete event
         try:
             # Try to get the final state from LangGraph
-            final_state = await self.app.aget_state(config)
+            final_state = await self.app.aget_state(run_config)
             if final_state and hasattr(final_state, 'values'):
-                state_values = final_state.values
-                # Merge with captured data, preferring state values
-                final_data = {**final_state_data, **state_values}
+                # Merge into the captured data (not needed afterwards), preferring state values
+                final_state_data.update(final_state.values)
+                final_data = final_state_data
             else:
                 # Use captured data if state retrieval fails
                 final_data = final_state_data
@@ -328,7 +366,7 @@ class ImprovedResearchWorkflow:
                 "timestamp": time.time()
             }
         except Exception as e:
-            print(f"[DEBUG] Error getting final state: {e}")
+            logger.error("Error getting final state: %s", e)
             # Use captured data as fallback
             yield {
                 "type": "complete",
@@ -360,7 +398,7 @@ async def run_research_agent(question: str, stream_callback=None) -> Dict[str, A
     final_result = None
     
     try:
-        async for update in workflow_instance.stream_research(question):
+        async for update in workflow_instance.stream_research(question, stream_callback):
             if stream_callback:
                 await stream_callback(update)
             
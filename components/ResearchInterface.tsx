@@ -54,7 +54,6 @@ export type ResearchStep = {
 const INITIAL_STEPS: ResearchStep[] = [
   { id: 'generating-queries', title: 'Generating Queries', status: 'pending', messages: [] },
   { id: 'search-web', title: 'Search Web', status: 'pending', messages: [] },
-  { id: 'aggregate-results', title: 'Aggregate Results', status: 'pending', messages: [] },
   { id: 'reflecting', title: 'Reflecting', status: 'pending', messages: [] },
   { id: 'generating-answer', title: 'Generating Answer', status: 'pending', messages: [] },
 ];
@@ -97,7 +96,6 @@ export function ResearchInterface({ query, onBackToSearch }: ResearchInterfacePr
     const phaseMap: Record<string, string> = {
       'generating_queries': 'generating-queries',
       'search_web': 'search-web',
-      'aggregate_results': 'aggregate-results',
       'reflection': 'reflecting',
       'generating_answer': 'generating-answer'
     };
@@ -108,7 +106,6 @@ export function ResearchInterface({ query, onBackToSearch }: ResearchInterfacePr
     const mapping: Record<string, string> = {
       'generate_queries': 'generating-queries',
       'web_search': 'search-web',
-      'aggregate_results': 'aggregate-results',
       'reflection': 'reflecting',
       'answer_generation': 'generating-answer'
     };
@@ -122,7 +119,6 @@ export function ResearchInterface({ query, onBackToSearch }: ResearchInterfacePr
     const messages: Record<string, string> = {
       'generate_queries': 'Analyzing your question to identify key research areas...',
       'web_search': `Searching for: "${actualInput.query?.substring(0, 50) || 'information'}..."`,
-      'aggregate_results': 'Analyzing collected information for consistency...',
       'reflection': 'Cross-referencing facts across multiple sources...',
       'answer_generation': 'Synthesizing information from all sources...'
     };
@@ -138,8 +134,6 @@ export function ResearchInterface({ query, onBackToSearch }: ResearchInterfacePr
         return `Generated ${actualOutput.query_list?.length || 0} targeted search queries`;
       case 'web_search':
         return `Found sources from search query`;
-      case 'aggregate_results':
-        return `Processed ${actualOutput.sources_gathered?.length || 0} sources`;
       case 'reflection':
         return `Identified ${actualOutput.follow_up_queries?.length || 0} follow-up areas`;
       case 'answer_generation':
@@ -199,41 +193,6 @@ Original Question: ${actualOutput.original_question || 'Not provided'}`;
         content += `Total Unique Sources: ${sources.length}`;
         return content;
 
-      case 'aggregate_results':
-        const sourcesGathered = actualOutput.sources_gathered || [];
-        const researchSummary = actualOutput.research_summary || {};
-
-        let aggContent = `Information Processing:\n`;
-        aggContent += `📚 Sources Processed: ${sourcesGathered.length}\n`;
-        aggContent += `✅ Information Sufficient: ${actualOutput.is_sufficient ? 'Yes' : 'No'}\n`;
-
-        if (actualOutput.knowledge_gap) {
-          aggContent += `❓ Knowledge Gap: ${actualOutput.knowledge_gap}\n`;
-        }
-
-        if (Object.keys(researchSummary).length > 0) {
-          aggContent += `\n📊 Research Summary:\n`;
-          Object.entries(researchSummary).forEach(([key, value]) => {
-            aggContent += `   ${key}: ${value}\n`;
-          });
-        }
-
-        if (sourcesGathered.length > 0) {
-          aggContent += `\n🔗 Key Sources:\n`;
-          sourcesGathered.slice(0, 5).forEach((source: any, i: number) => {
-            if (typeof source === 'string') {
-              aggContent += `   ${i + 1}. ${source}\n`;
-            } else if (source.url) {
-              aggContent += `   ${i + 1}. ${source.title || source.url}\n`;
-            }
-          });
-          if (sourcesGathered.length > 5) {
-            aggContent += `   ... and ${sourcesGathered.length - 5} more sources\n`;
-          }
-        }
-
-        return aggContent;
-
       case 'reflection':
         const followUpQueries = actualOutput.follow_up_queries || [];
         const warnings = actualOutput.warnings || [];
@@ -274,12 +233,14 @@ Original Question: ${actualOutput.original_question || 'Not provided'}`;
         return reflContent;
 
       case 'answer_generation':
+        // The full answer arrives with the "complete" event; node_complete only carries a preview
         const finalAnswer = actualOutput.final_answer || '';
+        const answerLength = actualOutput.answer_length ?? finalAnswer.length;
         const citations = actualOutput.citations || [];
         const researchStats = actualOutput.research_summary || {};
 
         let answerContent = `Answer Generation Complete:\n`;
-        answerContent += `📝 Answer Length: ${finalAnswer.length} characters\n`;
+        answerContent += `📝 Answer Length: ${answerLength} characters\n`;
         answerContent += `📚 Citations Included: ${citations.length}\n`;
 
         if (Object.keys(researchStats).length > 0) {
@@ -303,10 +264,11 @@ Original Question: ${actualOutput.original_question || 'Not provided'}`;
           }
         }
 
-        if (finalAnswer && finalAnswer.length > 0) {
-          const preview = finalAnswer.length > 200
-            ? finalAnswer.substring(0, 200) + '...'
-            : finalAnswer;
+        const answerPreview = actualOutput.answer_preview ?? finalAnswer.substring(0, 200);
+        if (answerPreview.length > 0) {
+          const preview = answerLength > answerPreview.length
+            ? answerPreview + '...'
+            : answerPreview;
           answerContent += `\n📄 Answer Preview:\n${preview}`;
         }
 
@@ -579,6 +541,9 @@ Original Question: ${actualOutput.original_question || 'Not provided'}`;
                   handleNodeStart(messageEvent);
                 } else if (eventData.type === 'node_complete') {
                   handleNodeComplete(messageEvent);
+                } else if (eventData.type === 'content') {
+                  // Answer tokens stream in; the complete event replaces them with the final text
+                  setFinalResult(prev => prev + eventData.content);
                 } else if (eventData.type === 'complete') {
                   handleComplete(messageEvent);
                   return; // End the stream
@@ -162,6 +162,9 @@ class ResearchApiClient {
     onError: (error: string) => void
   ): WebSocket {
     const ws = new WebSocket(`${this.wsUrl}/research/ws`);
+    // The backend sends UTF-8 JSON as binary frames
+    ws.binaryType = 'arraybuffer';
+    const decoder = new TextDecoder();
 
     // Set a connection timeout
     const connectionTimeout = setTimeout(() => {
@@ -179,7 +182,8 @@ class ResearchApiClient {
 
     ws.onmessage = (event) => {
       try {
-        const message: WebSocketMessage = JSON.parse(event.data);
+        const raw = typeof event.data === 'string' ? event.data : decoder.decode(event.data);
+        const message: WebSocketMessage = JSON.parse(raw);
 
         switch (message.type) {
           case 'research_started':
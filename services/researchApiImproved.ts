@@ -243,7 +243,6 @@ class ImprovedResearchApiClient {
     const nodeMap: Record<string, string> = {
       'generate_queries': 'generating_queries',
       'web_search': 'search_web',
-      'aggregate_results': 'search_web',
       'reflection': 'reflection',
       'answer_generation': 'generating_answer'
     };